@@ -1,73 +1,1839 @@
 import random
+import bisect
 import collections
+import hashlib
+import json
+import os
+import re
+import tempfile
+from array import array
+from collections.abc import Mapping, Sequence
+
+import numpy as np
+
+import instrumentation
+import utils
 
 
 class Edge:
     """
-    Represents an edge in a graph.
+    Represents an edge in a graph.
+
+    Attributes:
+        u: The source vertex of the edge.
+        v: The destination vertex of the edge.
+        weight: The weight of the edge.
+    """
+
+    __slots__ = ("u", "v", "weight")
+
+    def __init__(self, u, v, weight):
+        """
+        Initializes the edge.
+
+        Args:
+            u: The source vertex.
+            v: The destination vertex.
+            weight: The weight of the edge.
+        """
+        self.u = u
+        self.v = v
+        self.weight = weight
+
+
+@instrumentation.instrumented
+def buildGraph(P):
+    """
+    Builds a graph based on a list of input data.
+
+    Args:
+        P: A list of input data, where each element is a tuple containing u, v, t, and l.
+
+    Returns:
+        A tuple containing the list of vertices and the list of edges.
+    """
+
+    edges = []
+    vertices = {}
+
+    with instrumentation.phase("flights"):
+        for i in P:
+            u, v, t, l = i
+
+            vertices.setdefault((u, t), None)
+            vertices.setdefault((v, t + l), None)
+
+            edge = Edge((u, t), (v, t + l), l)
+
+            edges.append(edge)
+
+    vertices = list(vertices)
+    instrumentation.count("flights", len(edges))
+
+    with instrumentation.phase("cluster"):
+        clustered_vertices = collections.defaultdict(list)
+
+        for e in vertices:
+            clustered_vertices[e[0]].append(e)
+
+        # the copies are chained in time order, whatever the order of the flights
+        for value in clustered_vertices.values():
+            value.sort(key=lambda vertex: vertex[1])
+
+    with instrumentation.phase("waiting edges"):
+        for i, value in clustered_vertices.items():
+            edges.extend(
+                Edge(clustered_vertices[i][j], clustered_vertices[i][j + 1], 0)
+                for j in range(len(value) - 1)
+            )
+
+    instrumentation.count("vertices", len(vertices))
+    instrumentation.count("edges", len(edges))
+
+    return vertices, edges
+
+
+class _GraphArray:
+    """
+    Array attribute of a TimeExpandedGraph, brought up to date with the pending
+    flight updates of the graph when it is read.
+    """
+
+    def __set_name__(self, owner, name):
+        self.name = "_" + name
+
+    def __get__(self, G, owner=None):
+        if G is None:
+            return self
+
+        if G._updates:
+            G._apply_updates()
+
+        return G.__dict__[self.name]
+
+    def __set__(self, G, value):
+        G.__dict__[self.name] = value
+
+
+class TimeExpandedGraph:
+    """
+    Indexed representation of the time-expanded graph G tilde.
+
+    Airports are interned to integer ids in order of first appearance. A vertex
+    is a copy (airport, t) of an airport, and vertex ids are assigned in
+    (t, airport id) order. Every flight (u, v, t, l) becomes an edge of weight l
+    from (u, t) to (v, t + l), and the copies of each airport are linked in time
+    order by edges of weight 0.
+
+    Attributes:
+        airports (list): Airport names, indexed by airport id.
+        vertex_airport (np.ndarray): Airport id of each vertex.
+        vertex_time (np.ndarray): Timestamp of each vertex.
+        out_offsets (np.ndarray): CSR offsets, the out-edges of vertex i are
+            stored in positions out_offsets[i] to out_offsets[i + 1].
+        out_targets (np.ndarray): Destination vertex of each out-edge.
+        out_weights (np.ndarray): Weight of each out-edge.
+        in_offsets (np.ndarray): CSR offsets of the in-edges.
+        in_sources (np.ndarray): Source vertex of each in-edge.
+        in_weights (np.ndarray): Weight of each in-edge.
+        airport_offsets (np.ndarray): CSR offsets, the copies of airport a are
+            stored in positions airport_offsets[a] to airport_offsets[a + 1].
+        airport_vertices (np.ndarray): Vertex ids grouped by airport and sorted by time.
+        version (int): The number of flight updates applied to the graph.
+        landmarks (Landmarks or None): The landmark tables of the graph, saved
+            with it by save_graph.
+    """
+
+    vertex_airport = _GraphArray()
+    vertex_time = _GraphArray()
+    out_offsets = _GraphArray()
+    out_targets = _GraphArray()
+    out_weights = _GraphArray()
+    in_offsets = _GraphArray()
+    in_sources = _GraphArray()
+    in_weights = _GraphArray()
+    airport_offsets = _GraphArray()
+    airport_vertices = _GraphArray()
+
+    def __init__(
+        self,
+        airports,
+        vertex_airport,
+        vertex_time,
+        out_offsets,
+        out_targets,
+        out_weights,
+        in_offsets,
+        in_sources,
+        in_weights,
+        airport_offsets,
+        airport_vertices,
+    ):
+        self.airports = list(airports)
+        self.airport_ids = {name: i for i, name in enumerate(self.airports)}
+        self.version = 0
+        self._updates = collections.Counter()
+        self.vertex_airport = vertex_airport
+        self.vertex_time = vertex_time
+        self.out_offsets = out_offsets
+        self.out_targets = out_targets
+        self.out_weights = out_weights
+        self.in_offsets = in_offsets
+        self.in_sources = in_sources
+        self.in_weights = in_weights
+        self.airport_offsets = airport_offsets
+        self.airport_vertices = airport_vertices
+        self.landmarks = None
+        self._cache = {}
+
+    def __getstate__(self):
+        # the cached lists are rebuilt on demand rather than pickled
+        if self._updates:
+            self._apply_updates()
+
+        state = self.__dict__.copy()
+        state["_cache"] = {}
+
+        return state
+
+    @classmethod
+    def from_flights(cls, P):
+        """
+        Builds the time-expanded graph of a list of flights in O(E log E).
+
+        Args:
+            P: An iterable of flights, where each flight is a tuple (u, v, t, l).
+                It is consumed once, so a generator such as utils.iter_flights
+                is never materialized as a list.
+
+        Returns:
+            TimeExpandedGraph: The indexed time-expanded graph.
+        """
+        return cls.from_arrays(*_flight_arrays(P))
+
+    @classmethod
+    def from_arrays(cls, airports, src, dst, dep, dur):
+        """
+        Builds the time-expanded graph of flights given as parallel arrays.
+
+        Args:
+            airports (list): Airport names, indexed by airport id.
+            src (np.ndarray): Departure airport id of each flight.
+            dst (np.ndarray): Arrival airport id of each flight.
+            dep (np.ndarray): Departure time of each flight.
+            dur (np.ndarray): Duration of each flight.
+
+        Returns:
+            TimeExpandedGraph: The indexed time-expanded graph.
+        """
+        nb_airports = len(airports)
+
+        # a flight that stays at the same airport and takes no time is a self-loop
+        keep = (src != dst) | (dur != 0)
+        src, dst, dep, dur = src[keep], dst[keep], dep[keep], dur[keep]
+        nb_flights = len(src)
+
+        # vertices are the distinct (t, airport) pairs, numbered in sorted order
+        with instrumentation.phase("vertices"):
+            times = np.concatenate([dep, dep + dur])
+            places = np.concatenate([src, dst])
+            order = np.lexsort((places, times))
+            times, places = times[order], places[order]
+            first = np.ones(len(order), dtype=bool)
+            first[1:] = (times[1:] != times[:-1]) | (places[1:] != places[:-1])
+            inverse = np.empty(len(order), dtype=np.int64)
+            inverse[order] = np.cumsum(first) - 1
+            vertex_time = times[first]
+            vertex_airport = places[first]
+            nb_vertices = len(vertex_time)
+
+        # a stable sort by airport keeps the copies of each airport in time order
+        with instrumentation.phase("cluster"):
+            airport_vertices = np.argsort(vertex_airport, kind="stable")
+            airport_offsets = np.zeros(nb_airports + 1, dtype=np.int64)
+            np.cumsum(
+                np.bincount(vertex_airport, minlength=nb_airports),
+                out=airport_offsets[1:],
+            )
+
+        # waiting edges between consecutive copies of the same airport
+        with instrumentation.phase("waiting edges"):
+            previous, following = airport_vertices[:-1], airport_vertices[1:]
+            same_airport = vertex_airport[previous] == vertex_airport[following]
+
+            edge_u = np.concatenate([inverse[:nb_flights], previous[same_airport]])
+            edge_v = np.concatenate([inverse[nb_flights:], following[same_airport]])
+            edge_weight = np.concatenate(
+                [dur, np.zeros(np.count_nonzero(same_airport), dtype=np.int64)]
+            )
+
+        with instrumentation.phase("adjacency"):
+            out_offsets, out_order = _csr(edge_u, nb_vertices)
+            in_offsets, in_order = _csr(edge_v, nb_vertices)
+
+        instrumentation.count("flights", nb_flights)
+        instrumentation.count("vertices", nb_vertices)
+        instrumentation.count("edges", len(edge_u))
+
+        return cls(
+            airports,
+            _compact(vertex_airport),
+            vertex_time,
+            out_offsets,
+            _compact(edge_v[out_order]),
+            _compact(edge_weight[out_order]),
+            in_offsets,
+            _compact(edge_u[in_order]),
+            _compact(edge_weight[in_order]),
+            airport_offsets,
+            _compact(airport_vertices),
+        )
+
+    @classmethod
+    def from_lists(cls, vertices, edges):
+        """
+        Builds the time-expanded graph from the output of buildGraph.
+
+        The edges between two copies of the same airport with weight 0 are
+        waiting edges, they are rebuilt from the copies instead of being copied.
+
+        Args:
+            vertices (list): List of vertices in the graph.
+            edges (list): List of edges in the graph.
+
+        Returns:
+            TimeExpandedGraph: The indexed time-expanded graph.
+        """
+        P = [
+            (edge.u[0], edge.v[0], edge.u[1], edge.v[1] - edge.u[1])
+            for edge in edges
+            if edge.u[0] != edge.v[0] or edge.weight != 0
+        ]
+
+        return cls.from_flights(P)
+
+    @property
+    def num_vertices(self):
+        """int: The number of vertices."""
+        return len(self.vertex_time)
+
+    @property
+    def num_edges(self):
+        """int: The number of edges, waiting edges included."""
+        return len(self.out_targets)
+
+    @property
+    def edge_u(self):
+        """np.ndarray: The source vertex of each edge, in CSR order."""
+        if "edge_u" not in self._cache:
+            self._cache["edge_u"] = np.repeat(
+                np.arange(self.num_vertices, dtype=self.out_targets.dtype),
+                np.diff(self.out_offsets),
+            )
+
+        return self._cache["edge_u"]
+
+    @property
+    def edge_v(self):
+        """np.ndarray: The destination vertex of each edge, in CSR order."""
+        return self.out_targets
+
+    @property
+    def edge_weight(self):
+        """np.ndarray: The weight of each edge, in CSR order."""
+        return self.out_weights
+
+    @property
+    def vertices(self):
+        """VertexView: The vertices as (airport, t) tuples, indexed by vertex id."""
+        return VertexView(self)
+
+    @property
+    def edges(self):
+        """EdgeView: The edges as Edge objects, in CSR order."""
+        return EdgeView(self)
+
+    @property
+    def vertex_index(self):
+        """VertexIndex: The mapping from (airport, t) tuples to vertex ids."""
+        return VertexIndex(self)
+
+    def is_dag(self):
+        """
+        Checks whether the vertex ids are a topological order of the graph.
+
+        Flights with a positive duration and waiting edges always lead to a later
+        vertex. A flight with a zero duration may lead back to an earlier vertex
+        of the same time, and a negative duration to an earlier time.
+
+        Returns:
+            bool: True if every edge leads to a vertex with a larger id.
+        """
+        if "is_dag" not in self._cache:
+            self._cache["is_dag"] = bool(np.all(self.edge_v > self.edge_u))
+
+        return self._cache["is_dag"]
+
+    def vertex(self, i):
+        """
+        Returns the (airport, t) tuple of a vertex id.
+
+        Args:
+            i (int): The vertex id.
+
+        Returns:
+            tuple: The vertex as (airport, t).
+        """
+        return self.airports[self.vertex_airport[i]], int(self.vertex_time[i])
+
+    def copies(self, airport):
+        """
+        Returns the vertex ids of the copies of an airport, sorted by time.
+
+        Args:
+            airport (str): The airport name.
+
+        Returns:
+            np.ndarray: The vertex ids, empty if the airport is unknown.
+        """
+        a = self.airport_ids.get(airport)
+
+        if a is None:
+            return self.airport_vertices[:0]
+
+        return self.airport_vertices[self.airport_offsets[a] : self.airport_offsets[a + 1]]
+
+    def copy_times(self, airport):
+        """
+        Returns the timestamps of the copies of an airport, sorted.
+
+        Args:
+            airport (str): The airport name.
+
+        Returns:
+            np.ndarray: The timestamps, aligned with copies(airport).
+        """
+        return self.vertex_time[self.copies(airport)]
+
+    def first_copy(self, airport, t=None):
+        """
+        Returns the first copy of an airport, at or after a time.
+
+        Vertex ids are sorted by time, so a binary search in the vertex times
+        followed by one in the copies of the airport finds it in O(log V).
+
+        Args:
+            airport (str): The airport name.
+            t (int, optional): The earliest timestamp, defaults to no bound.
+
+        Returns:
+            int or None: The vertex id, or None if there is no such copy.
+        """
+        copies = self.copies(airport)
+        i = 0 if t is None else np.searchsorted(copies, np.searchsorted(self.vertex_time, t))
+
+        return int(copies[i]) if i < len(copies) else None
+
+    def last_copy(self, airport, t=None):
+        """
+        Returns the last copy of an airport, at or before a time.
+
+        Args:
+            airport (str): The airport name.
+            t (int, optional): The latest timestamp, defaults to no bound.
+
+        Returns:
+            int or None: The vertex id, or None if there is no such copy.
+        """
+        copies = self.copies(airport)
+
+        if t is None:
+            i = len(copies)
+        else:
+            i = np.searchsorted(copies, np.searchsorted(self.vertex_time, t, side="right"))
+
+        return int(copies[i - 1]) if i > 0 else None
+
+    def vertex_id(self, airport, t):
+        """
+        Returns the id of the vertex (airport, t).
+
+        Args:
+            airport (str): The airport name.
+            t (int): The timestamp.
+
+        Returns:
+            int or None: The vertex id, or None if there is no such copy.
+        """
+        i = self.first_copy(airport, t)
+
+        if i is not None and self.vertex_time[i] == t:
+            return i
+
+        return None
+
+    def out_edges(self, i):
+        """
+        Returns the out-edges of a vertex.
+
+        Args:
+            i (int): The vertex id.
+
+        Returns:
+            tuple: The destination vertex ids and the weights of the edges.
+        """
+        start, end = self.out_offsets[i], self.out_offsets[i + 1]
+
+        return self.out_targets[start:end], self.out_weights[start:end]
+
+    def in_edges(self, i):
+        """
+        Returns the in-edges of a vertex.
+
+        Args:
+            i (int): The vertex id.
+
+        Returns:
+            tuple: The source vertex ids and the weights of the edges.
+        """
+        start, end = self.in_offsets[i], self.in_offsets[i + 1]
+
+        return self.in_sources[start:end], self.in_weights[start:end]
+
+    def adjacency(self):
+        """
+        Returns the out-adjacency CSR arrays as lists, built once and cached.
+
+        Pure Python searches index lists much faster than numpy arrays.
+
+        Returns:
+            tuple: The lists of offsets, target vertex ids and weights.
+        """
+        if "adjacency" not in self._cache:
+            self._cache["adjacency"] = (
+                self.out_offsets.tolist(),
+                self.out_targets.tolist(),
+                self.out_weights.tolist(),
+            )
+
+        return self._cache["adjacency"]
+
+    def vertex_airports(self):
+        """
+        Returns the airport id of each vertex as a list, built once and cached.
+
+        Returns:
+            list: The airport ids, indexed by vertex id.
+        """
+        if "vertex_airports" not in self._cache:
+            self._cache["vertex_airports"] = self.vertex_airport.tolist()
+
+        return self._cache["vertex_airports"]
+
+    def routes(self, reverse=False):
+        """
+        Returns the airport level graph, with the shortest flight duration of
+        each route, as CSR lists built once and cached.
+
+        Args:
+            reverse (bool): Whether to reverse the routes, so that the lists
+                give the routes reaching each airport.
+
+        Returns:
+            tuple: The lists of offsets, airport ids at the other end of each
+                route and durations.
+        """
+        key = ("routes", reverse)
+
+        if key not in self._cache:
+            src, dst, dep, arr = self.flights()
+
+            if reverse:
+                src, dst = dst, src
+
+            order = np.lexsort((arr - dep, dst, src))
+            src, dst, dur = src[order], dst[order], (arr - dep)[order]
+            # the first flight of each (src, dst) pair is the shortest one
+            first = np.ones(len(src), dtype=bool)
+            first[1:] = (src[1:] != src[:-1]) | (dst[1:] != dst[:-1])
+            first &= src != dst
+            offsets = np.zeros(len(self.airports) + 1, dtype=np.int64)
+            np.cumsum(
+                np.bincount(src[first], minlength=len(self.airports)), out=offsets[1:]
+            )
+            self._cache[key] = (
+                offsets.tolist(),
+                dst[first].tolist(),
+                dur[first].tolist(),
+            )
+
+        return self._cache[key]
+
+    def flights(self):
+        """
+        Returns the flights of the graph, that is every edge but the waiting edges.
+
+        Returns:
+            tuple: The departure airport ids, arrival airport ids, departure times
+                and arrival times of the flights, as arrays in CSR order.
+        """
+        if "flights" not in self._cache:
+            edge_u, edge_v = self.edge_u, self.edge_v
+            src = self.vertex_airport[edge_u]
+            dst = self.vertex_airport[edge_v]
+            flight = (src != dst) | (self.out_weights != 0)
+            self._cache["flights"] = (
+                src[flight],
+                dst[flight],
+                self.vertex_time[edge_u[flight]],
+                self.vertex_time[edge_v[flight]],
+            )
+
+        return self._cache["flights"]
+
+    def connections(self, order="departure"):
+        """
+        Returns the flights sorted by departure time or by arrival time.
+
+        The lists are built once per order and cached, they are the input of the
+        connection scan algorithms.
+
+        Args:
+            order (str): "departure" to sort by departure then arrival time,
+                "arrival" to sort by arrival then departure time.
+
+        Returns:
+            tuple: The lists of departure times, arrival times, departure airport
+                ids and arrival airport ids of the flights.
+        """
+        key = ("connections", order)
+
+        if key not in self._cache:
+            src, dst, dep, arr = self.flights()
+
+            if order == "departure":
+                permutation = np.lexsort((arr, dep))
+            elif order == "arrival":
+                permutation = np.lexsort((dep, arr))
+            else:
+                raise ValueError(f"Unknown connection order: {order}")
+
+            self._cache[key] = (
+                dep[permutation].tolist(),
+                arr[permutation].tolist(),
+                src[permutation].tolist(),
+                dst[permutation].tolist(),
+            )
+
+        return self._cache[key]
+
+    def departures(self):
+        """
+        Returns the flights sorted by departure airport then departure time, as
+        lists built once and cached, in the layout of TimeDependentGraph.departures.
+
+        Returns:
+            tuple: The lists of offsets, departure times, arrival times and
+                arrival airport ids.
+        """
+        if "departures" not in self._cache:
+            src, dst, dep, arr = self.flights()
+            order = np.lexsort((arr, dep, src))
+            offsets = np.zeros(len(self.airports) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(src, minlength=len(self.airports)), out=offsets[1:])
+            self._cache["departures"] = (
+                offsets.tolist(),
+                dep[order].tolist(),
+                arr[order].tolist(),
+                dst[order].tolist(),
+            )
+
+        return self._cache["departures"]
+
+    def arrivals(self):
+        """
+        Returns the flights sorted by arrival airport then arrival time, as
+        lists built once and cached, in the layout of TimeDependentGraph.arrivals.
+
+        Returns:
+            tuple: The lists of offsets, arrival times, departure times and
+                departure airport ids.
+        """
+        if "arrivals" not in self._cache:
+            src, dst, dep, arr = self.flights()
+            order = np.lexsort((dep, arr, dst))
+            offsets = np.zeros(len(self.airports) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(dst, minlength=len(self.airports)), out=offsets[1:])
+            self._cache["arrivals"] = (
+                offsets.tolist(),
+                arr[order].tolist(),
+                dep[order].tolist(),
+                src[order].tolist(),
+            )
+
+        return self._cache["arrivals"]
+
+    def min_weight(self):
+        """
+        Returns the smallest weight of an edge, cached.
+
+        Removing a flight keeps the cached value, which is then a lower bound.
+
+        Returns:
+            int: The smallest weight, 0 if the graph has no edges.
+        """
+        if "min_weight" not in self._cache:
+            weights = self.out_weights
+            self._cache["min_weight"] = int(weights.min()) if len(weights) else 0
+
+        return self._cache["min_weight"]
+
+    @property
+    def pending_updates(self):
+        """int: The number of flight updates not yet applied to the arrays of G tilde."""
+        return sum(map(abs, self._updates.values()))
+
+    def first_time(self, a, t_min=None, t_max=None):
+        """
+        Returns the time of the first copy of an airport between two times.
+
+        Without pending updates it is the time of first_copy. Otherwise it is
+        read from departures() and arrivals(), which the updates keep up to
+        date, so that the arrays of G tilde are not rebuilt.
+
+        Args:
+            a (int): The airport id.
+            t_min (int, optional): The earliest time, defaults to no bound.
+            t_max (int, optional): The latest time, defaults to no bound.
+
+        Returns:
+            int or None: The time, or None if there is no such copy.
+        """
+        if not self._updates:
+            i = self.first_copy(self.airports[a], t_min)
+            t = None if i is None else int(self.vertex_time[i])
+        else:
+            candidates = []
+
+            for offsets, times, _, _ in (self.departures(), self.arrivals()):
+                lo, hi = offsets[a], offsets[a + 1]
+
+                if t_min is not None:
+                    lo = bisect.bisect_left(times, t_min, lo, hi)
+
+                if lo < hi:
+                    candidates.append(times[lo])
+
+            t = min(candidates, default=None)
+
+        return None if t is None or (t_max is not None and t > t_max) else t
+
+    def window(self, t_min=None, t_max=None):
+        """
+        Returns a zero-copy view of the graph between two times.
+
+        Args:
+            t_min (int, optional): The earliest time of the window.
+            t_max (int, optional): The latest time of the window.
+
+        Returns:
+            TimeWindow: The view.
+        """
+        return TimeWindow(self, t_min, t_max)
+
+    def add_flight(self, u, v, t, l):
+        """
+        Adds a flight (u, v, t, l) to the graph.
+
+        The flight is inserted in place in the flight indexes (connections,
+        departures and arrivals, built by the first update if they are
+        missing), with a binary search and a list insertion, so type_1 to
+        type_4 see it at once. The vertex arrays of G
+        tilde, where a new copy would shift every later vertex id, are rebuilt
+        once for all the pending updates the next time they are read, by a
+        search over the vertices such as dijkstra or a windowed type_4.
+
+        A flight that stays at the same airport and takes no time is a self-loop,
+        it is ignored as when the graph is built.
+
+        Args:
+            u (str): The departure airport, added to the airports if it is new.
+            v (str): The arrival airport, added to the airports if it is new.
+            t (int): The departure time.
+            l (int): The duration.
+        """
+        if u == v and l == 0:
+            return
+
+        for airport in (u, v):
+            if airport not in self.airport_ids:
+                self.airport_ids[airport] = len(self.airports)
+                self.airports.append(airport)
+
+        self._update((self.airport_ids[u], self.airport_ids[v], t, l), 1)
+
+    def remove_flight(self, u, v, t, l):
+        """
+        Removes a flight (u, v, t, l) from the graph, such as a cancelled flight.
+
+        Checking that the flight exists costs a binary search in the copies of u
+        and a scan of the out-edges of (u, t). As for add_flight, the flight is
+        removed in place from the flight indexes, and the arrays are rebuilt
+        when they are next read.
+
+        Args:
+            u (str): The departure airport.
+            v (str): The arrival airport.
+            t (int): The departure time.
+            l (int): The duration.
+
+        Raises:
+            ValueError: If the graph has no such flight.
+        """
+        if u not in self.airport_ids or v not in self.airport_ids:
+            raise ValueError(f"Unknown flight: {(u, v, t, l)}")
+
+        flight = (self.airport_ids[u], self.airport_ids[v], t, l)
+
+        if len(self._flight_edges(*flight)) + self._updates[flight] <= 0:
+            raise ValueError(f"Unknown flight: {(u, v, t, l)}")
+
+        self._update(flight, -1)
+
+    def delay_flight(self, u, v, t, l, delay):
+        """
+        Delays a flight (u, v, t, l) of the graph by a given time.
+
+        Args:
+            u (str): The departure airport.
+            v (str): The arrival airport.
+            t (int): The departure time.
+            l (int): The duration.
+            delay (int): The delay, negative to bring the flight forward.
+
+        Raises:
+            ValueError: If the graph has no such flight.
+        """
+        self.remove_flight(u, v, t, l)
+        self.add_flight(u, v, t + delay, l)
+
+    def _update(self, flight, count):
+        """
+        Records a pending flight update and patches the flight indexes.
+
+        The flight indexes missing are built before the first update, so that
+        the queries never need the vertex arrays while updates are pending. The
+        indexes over the vertices of G tilde are dropped, they are rebuilt with
+        the arrays.
+
+        Args:
+            flight (tuple): The flight (u, v, t, l), u and v being airport ids.
+            count (int): 1 to add the flight, -1 to remove it.
+        """
+        self.connections("departure")
+        self.connections("arrival")
+        self.departures()
+        self.arrivals()
+        self.min_weight()
+        self._updates[flight] += count
+
+        if self._updates[flight] == 0:
+            del self._updates[flight]
+
+        self._cache = {
+            key: value for key, value in self._cache.items() if key in FLIGHT_INDEXES
+        }
+        u, v, t, l = flight
+
+        if ("connections", "departure") in self._cache:
+            dep, arr, src, dst = self._cache["connections", "departure"]
+            _patch_sorted((dep, arr, src, dst), (t, t + l, u, v), count)
+
+        if ("connections", "arrival") in self._cache:
+            dep, arr, src, dst = self._cache["connections", "arrival"]
+            _patch_sorted((arr, dep, src, dst), (t + l, t, u, v), count)
+
+        if "departures" in self._cache:
+            offsets, dep, arr, dst = self._cache["departures"]
+            _patch_csr(offsets, len(self.airports), u, (dep, arr, dst), (t, t + l, v), count)
+
+        if "arrivals" in self._cache:
+            offsets, arr, dep, src = self._cache["arrivals"]
+            _patch_csr(offsets, len(self.airports), v, (arr, dep, src), (t + l, t, u), count)
+
+        if "min_weight" in self._cache:
+            self._cache["min_weight"] = min(self._cache["min_weight"], l)
+
+        self.version += 1
+
+    def _flight_edges(self, u, v, t, l):
+        """
+        Returns the positions of the edges of a flight in the arrays, without
+        the pending updates.
+
+        Args:
+            u (int): The departure airport id.
+            v (int): The arrival airport id.
+            t (int): The departure time.
+            l (int): The duration.
+
+        Returns:
+            np.ndarray: The positions of the matching out-edges, in CSR order.
+        """
+        # read the stored arrays, the properties would apply the pending updates
+        arrays = self.__dict__
+        airport_offsets = arrays["_airport_offsets"]
+        vertex_airport, vertex_time = arrays["_vertex_airport"], arrays["_vertex_time"]
+
+        # zero-duration self-loops are never stored, and new airports have no copies
+        if (u == v and l == 0) or max(u, v) >= len(airport_offsets) - 1:
+            return np.empty(0, dtype=np.int64)
+
+        copies = arrays["_airport_vertices"][airport_offsets[u] : airport_offsets[u + 1]]
+        i = np.searchsorted(vertex_time[copies], t)
+
+        if i == len(copies) or vertex_time[copies[i]] != t:
+            return np.empty(0, dtype=np.int64)
+
+        start, end = arrays["_out_offsets"][copies[i]], arrays["_out_offsets"][copies[i] + 1]
+        targets, weights = arrays["_out_targets"][start:end], arrays["_out_weights"][start:end]
+        match = (
+            (vertex_airport[targets] == v)
+            & (vertex_time[targets] == t + l)
+            & (weights == l)
+        )
+
+        return start + np.flatnonzero(match)
+
+    def _apply_updates(self):
+        """
+        Rebuilds the vertex arrays of G tilde with the pending flight updates.
+
+        The vertex ids are positions in time order and the edges are stored
+        contiguously, so a new copy of an airport shifts the ids of every later
+        vertex. The arrays are therefore rebuilt in O(E log E) from the kept
+        flights and the added ones, once for all the updates recorded since the
+        last read.
+        """
+        updates, self._updates = self._updates, collections.Counter()
+        arrays = self.__dict__
+        vertex_airport, vertex_time = arrays["_vertex_airport"], arrays["_vertex_time"]
+        out_offsets = arrays["_out_offsets"]
+        targets, weights = arrays["_out_targets"], arrays["_out_weights"]
+
+        edge_u = np.repeat(np.arange(len(vertex_time)), np.diff(out_offsets))
+        src, dst = vertex_airport[edge_u], vertex_airport[targets]
+        keep = (src != dst) | (weights != 0)
+        added = []
+
+        for flight, count in updates.items():
+            if count > 0:
+                added.extend([flight] * count)
+            else:
+                keep[self._flight_edges(*flight)[:-count]] = False
+
+        added = np.array(added, dtype=np.int64).reshape(-1, 4)
+        H = TimeExpandedGraph.from_arrays(
+            self.airports,
+            np.concatenate([src[keep], added[:, 0]]),
+            np.concatenate([dst[keep], added[:, 1]]),
+            np.concatenate([vertex_time[edge_u[keep]], added[:, 2]]),
+            np.concatenate([weights[keep], added[:, 3]]),
+        )
+
+        for name in GRAPH_ARRAYS:
+            setattr(self, name, getattr(H, name))
+
+        # the flight indexes were patched by every update, the others are rebuilt
+        self._cache = {
+            key: value for key, value in self._cache.items() if key in FLIGHT_INDEXES
+        }
+
+
+class Landmarks:
+    """
+    Distance tables of a few landmark airports, giving lower bounds on the
+    duration of the flights from any airport to another one (ALT bounds).
+
+    The distances are shortest total flight durations on the airport level
+    graph, whatever the departure times. By the triangle inequality, the
+    duration from a to d is at least d(a, L) - d(d, L) and d(L, d) - d(L, a)
+    for every landmark L.
+
+    Attributes:
+        airports (np.ndarray): The airport id of each landmark.
+        to_landmark (np.ndarray): to_landmark[i, a] is the distance from
+            airport a to the i-th landmark, inf if it is unreachable.
+        from_landmark (np.ndarray): from_landmark[i, a] is the distance from
+            the i-th landmark to airport a.
+        version (int): The version of the graph the tables were computed for,
+            they are no longer valid bounds once flights are added.
+    """
+
+    def __init__(self, airports, to_landmark, from_landmark, version=0):
+        self.airports = airports
+        self.to_landmark = to_landmark
+        self.from_landmark = from_landmark
+        self.version = version
+
+    def __len__(self):
+        return len(self.airports)
+
+    def bounds(self, target):
+        """
+        Computes a lower bound on the duration from every airport to a target airport.
+
+        Args:
+            target (int): The target airport id.
+
+        Returns:
+            np.ndarray: The lower bound of each airport, inf for the airports
+                the landmarks prove cannot reach the target.
+        """
+        bounds = np.zeros(self.to_landmark.shape[1])
+
+        if not len(self):
+            return bounds
+
+        with np.errstate(invalid="ignore"):
+            # d(a, d) >= d(a, L) - d(d, L), and a reaching d would reach every
+            # landmark d reaches
+            forward = self.to_landmark - self.to_landmark[:, target : target + 1]
+            # d(a, d) >= d(L, d) - d(L, a), and a reachable from L would make
+            # d reachable from L
+            backward = self.from_landmark[:, target : target + 1] - self.from_landmark
+
+        candidates = np.concatenate([forward, backward])
+        candidates[np.isnan(candidates)] = 0
+        np.maximum(candidates.max(axis=0), 0, out=bounds)
+        bounds[target] = 0
+
+        return bounds
+
+
+class TimeWindow:
+    """
+    Zero-copy view of the part of a TimeExpandedGraph between two times.
+
+    Vertex ids are sorted by time, so the copies of the window are the vertex
+    ids first_vertex to last_vertex - 1, and their arrays are slices of the
+    arrays of the graph. The flights of the window are likewise a range of
+    the connections of the graph. The vertex ids are only computed when they
+    are read, so a connection scan within a window never needs the vertex
+    arrays of a graph with pending flight updates.
+
+    Attributes:
+        graph (TimeExpandedGraph): The viewed graph.
+        t_min (int or None): The earliest time of the window, None for no bound.
+        t_max (int or None): The latest time of the window, None for no bound.
+        first_vertex (int): The first vertex id of the window.
+        last_vertex (int): The vertex id following the last one of the window.
+    """
+
+    def __init__(self, G, t_min=None, t_max=None):
+        self.graph = G
+        self.t_min = t_min
+        self.t_max = t_max
+
+    @property
+    def first_vertex(self):
+        """int: The first vertex id of the window."""
+        if self.t_min is None:
+            return 0
+
+        return int(np.searchsorted(self.graph.vertex_time, self.t_min))
+
+    @property
+    def last_vertex(self):
+        """int: The vertex id following the last one of the window."""
+        vertex_time = self.graph.vertex_time
+
+        if self.t_max is None:
+            return len(vertex_time)
+
+        return max(
+            int(np.searchsorted(vertex_time, self.t_max, side="right")), self.first_vertex
+        )
+
+    def __repr__(self):
+        return f"TimeWindow({self.t_min}, {self.t_max}, {self.num_vertices} vertices)"
+
+    @property
+    def airports(self):
+        """list: Airport names, indexed by airport id."""
+        return self.graph.airports
+
+    @property
+    def airport_ids(self):
+        """dict: The mapping from airport names to airport ids."""
+        return self.graph.airport_ids
+
+    @property
+    def num_vertices(self):
+        """int: The number of vertices of the window."""
+        return self.last_vertex - self.first_vertex
+
+    @property
+    def vertex_time(self):
+        """np.ndarray: Timestamp of each vertex of the window, a slice of the graph array."""
+        return self.graph.vertex_time[self.first_vertex : self.last_vertex]
+
+    @property
+    def vertex_airport(self):
+        """np.ndarray: Airport id of each vertex of the window, a slice of the graph array."""
+        return self.graph.vertex_airport[self.first_vertex : self.last_vertex]
+
+    @property
+    def out_offsets(self):
+        """
+        np.ndarray: CSR offsets of the out-edges of the vertices of the window,
+        a slice of the graph array. Some of the edges lead out of the window.
+        """
+        return self.graph.out_offsets[self.first_vertex : self.last_vertex + 1]
+
+    def __contains__(self, i):
+        return self.first_vertex <= i < self.last_vertex
+
+    def first_copy(self, airport):
+        """
+        Returns the first copy of an airport in the window.
+
+        Args:
+            airport (str): The airport name.
+
+        Returns:
+            int or None: The vertex id, or None if there is no such copy.
+        """
+        i = self.graph.first_copy(airport, self.t_min)
+
+        return i if i is not None and i < self.last_vertex else None
+
+    def last_copy(self, airport):
+        """
+        Returns the last copy of an airport in the window.
+
+        Args:
+            airport (str): The airport name.
+
+        Returns:
+            int or None: The vertex id, or None if there is no such copy.
+        """
+        i = self.graph.last_copy(airport, self.t_max)
+
+        return i if i is not None and i >= self.first_vertex else None
+
+    def connection_range(self, order="departure"):
+        """
+        Returns the range of the connections of the graph departing, or
+        arriving, within the window.
+
+        Args:
+            order (str): The order of the connections, as in
+                TimeExpandedGraph.connections.
+
+        Returns:
+            tuple: The first index of the range and the index following its last one.
+        """
+        dep, arr, _, _ = self.graph.connections(order)
+        times = dep if order == "departure" else arr
+        lo = 0 if self.t_min is None else bisect.bisect_left(times, self.t_min)
+        hi = len(times) if self.t_max is None else bisect.bisect_right(times, self.t_max)
+
+        return lo, max(lo, hi)
+
+
+class VertexView(Sequence):
+    """
+    Read-only list of the vertices of a TimeExpandedGraph as (airport, t) tuples.
+
+    The tuples are created on access, so that code written for the output of
+    buildGraph works on the graph without materializing them.
+    """
+
+    def __init__(self, G):
+        self._G = G
+
+    def __len__(self):
+        return self._G.num_vertices
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._G.vertex(j) for j in range(*i.indices(len(self)))]
+
+        if i < 0:
+            i += len(self)
+
+        if not 0 <= i < len(self):
+            raise IndexError("vertex index out of range")
+
+        return self._G.vertex(i)
+
+    def __iter__(self):
+        airports = self._G.airports
+
+        for a, t in zip(self._G.vertex_airport.tolist(), self._G.vertex_time.tolist()):
+            yield airports[a], t
+
+    def __contains__(self, vertex):
+        return vertex in self._G.vertex_index
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+class EdgeView(Sequence):
+    """
+    Read-only list of the edges of a TimeExpandedGraph as Edge objects.
+
+    The Edge objects are created on access from the edge arrays.
+    """
+
+    def __init__(self, G):
+        self._G = G
+
+    def __len__(self):
+        return self._G.num_edges
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+
+        if i < 0:
+            i += len(self)
+
+        if not 0 <= i < len(self):
+            raise IndexError("edge index out of range")
+
+        G = self._G
+
+        return Edge(G.vertex(G.edge_u[i]), G.vertex(G.edge_v[i]), int(G.edge_weight[i]))
+
+    def __iter__(self):
+        G = self._G
+        vertices = list(G.vertices)
+
+        for u, v, w in zip(G.edge_u.tolist(), G.edge_v.tolist(), G.edge_weight.tolist()):
+            yield Edge(vertices[u], vertices[v], w)
+
+
+class VertexIndex(Mapping):
+    """
+    Read-only mapping from the (airport, t) vertices of a TimeExpandedGraph to their ids.
+
+    Lookups use a binary search in the copies of the airport instead of a dict.
+    """
+
+    def __init__(self, G):
+        self._G = G
+
+    def __getitem__(self, vertex):
+        try:
+            i = self._G.vertex_id(*vertex)
+        except (TypeError, ValueError):
+            i = None
+
+        if i is None:
+            raise KeyError(vertex)
+
+        return i
+
+    def __iter__(self):
+        return iter(self._G.vertices)
+
+    def __len__(self):
+        return self._G.num_vertices
+
+
+def _flight_arrays(P):
+    """
+    Interns the airports of a list of flights and stores the flights in arrays.
+
+    Args:
+        P: An iterable of flights, where each flight is a tuple (u, v, t, l).
+            It is consumed once.
+
+    Returns:
+        tuple: The list of airport names, indexed by airport id, and the arrays
+            of departure airport ids, arrival airport ids, departure times and
+            durations.
+    """
+    airport_ids = {}
+    src, dst, dep, dur = array("q"), array("q"), array("q"), array("q")
+
+    for u, v, t, l in P:
+        src.append(airport_ids.setdefault(u, len(airport_ids)))
+        dst.append(airport_ids.setdefault(v, len(airport_ids)))
+        dep.append(t)
+        dur.append(l)
+
+    return (
+        list(airport_ids),
+        np.frombuffer(src, dtype=np.int64),
+        np.frombuffer(dst, dtype=np.int64),
+        np.frombuffer(dep, dtype=np.int64),
+        np.frombuffer(dur, dtype=np.int64),
+    )
+
+
+def _compact(array):
+    """
+    Converts an integer array to int32 when its values fit.
+
+    Args:
+        array (np.ndarray): The integer array.
+
+    Returns:
+        np.ndarray: The array as int32, or unchanged.
+    """
+    info = np.iinfo(np.int32)
+
+    if len(array) == 0 or (array.min() >= info.min and array.max() <= info.max):
+        return array.astype(np.int32)
+
+    return array
+
+
+def _csr(keys, size):
+    """
+    Computes the CSR offsets and the permutation grouping items by key.
+
+    Args:
+        keys (np.ndarray): The key of each item, between 0 and size - 1.
+        size (int): The number of keys.
+
+    Returns:
+        tuple: The offsets array of length size + 1 and the permutation.
+    """
+    offsets = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=size), out=offsets[1:])
+
+    return offsets, np.argsort(keys, kind="stable")
+
+
+def _patch_sorted(columns, item, count, lo=0, hi=None):
+    """
+    Inserts or removes an item in parallel lists sorted by their first two lists.
+
+    Args:
+        columns (tuple): The parallel lists, sorted by the first one then the
+            second one between lo and hi.
+        item (tuple): The value of the item in each list.
+        count (int): 1 to insert the item, -1 to remove one copy of it.
+        lo (int): The first index of the sorted range.
+        hi (int, optional): The index following the last one of the sorted range.
+    """
+    first, second = columns[0], columns[1]
+    hi = len(first) if hi is None else hi
+    lo = bisect.bisect_left(first, item[0], lo, hi)
+    hi = bisect.bisect_right(first, item[0], lo, hi)
+    lo = bisect.bisect_left(second, item[1], lo, hi)
+    hi = bisect.bisect_right(second, item[1], lo, hi)
+
+    if count > 0:
+        for column, value in zip(columns, item):
+            column.insert(hi, value)
+
+        return
+
+    for k in range(lo, hi):
+        if all(column[k] == value for column, value in zip(columns[2:], item[2:])):
+            for column in columns:
+                del column[k]
+
+            return
+
+
+def _patch_csr(offsets, size, key, columns, item, count):
+    """
+    Inserts or removes an item in CSR lists sorted within each key.
+
+    Args:
+        offsets (list): The CSR offsets, extended to size + 1 entries.
+        size (int): The number of keys.
+        key (int): The key of the item.
+        columns (tuple): The parallel lists, see _patch_sorted.
+        item (tuple): The value of the item in each list.
+        count (int): 1 to insert the item, -1 to remove one copy of it.
+    """
+    offsets.extend([offsets[-1]] * (size + 1 - len(offsets)))
+    _patch_sorted(columns, item, count, offsets[key], offsets[key + 1])
+    offsets[key + 1 :] = [offset + count for offset in offsets[key + 1 :]]
+
+
+@instrumentation.instrumented
+def build_time_expanded_graph(P, airports=None):
+    """
+    Builds the indexed time-expanded graph of a list of flights.
+
+    Args:
+        P: A list of input data, where each element is a tuple containing u, v, t, and l,
+            or a structured array as returned by utils.load_flights.
+        airports (list, optional): The airport names the u and v fields of a
+            structured array refer to.
+
+    Returns:
+        TimeExpandedGraph: The indexed time-expanded graph.
+    """
+    if isinstance(P, np.ndarray):
+        return TimeExpandedGraph.from_arrays(
+            airports,
+            P["u"].astype(np.int64),
+            P["v"].astype(np.int64),
+            P["t"].astype(np.int64),
+            P["l"].astype(np.int64),
+        )
+
+    return TimeExpandedGraph.from_flights(P)
+
+
+class TimeDependentGraph:
+    """
+    Time-dependent representation of the flights, an alternative to G tilde.
+
+    The flights leaving each airport are stored sorted by departure time, and
+    the flights reaching it sorted by arrival time. The copies of the airports
+    and the waiting edges are never built: a search at airport a at time t
+    finds the flights it can take by binary search on the departure times of
+    a. The memory grows with the number of flights only, whatever the number of
+    distinct timestamps.
 
     Attributes:
-        u: The source vertex of the edge.
-        v: The destination vertex of the edge.
-        weight: The weight of the edge.
+        airports (list): Airport names, indexed by airport id.
+        out_offsets (np.ndarray): CSR offsets, the flights leaving airport a are
+            stored in positions out_offsets[a] to out_offsets[a + 1].
+        out_departures (np.ndarray): Departure time of each leaving flight.
+        out_arrivals (np.ndarray): Arrival time of each leaving flight.
+        out_targets (np.ndarray): Arrival airport id of each leaving flight.
+        in_offsets (np.ndarray): CSR offsets of the flights reaching each airport.
+        in_arrivals (np.ndarray): Arrival time of each reaching flight.
+        in_departures (np.ndarray): Departure time of each reaching flight.
+        in_sources (np.ndarray): Departure airport id of each reaching flight.
     """
 
-    u = ()
-    v = ()
-    weight = 0
+    def __init__(
+        self,
+        airports,
+        out_offsets,
+        out_departures,
+        out_arrivals,
+        out_targets,
+        in_offsets,
+        in_arrivals,
+        in_departures,
+        in_sources,
+    ):
+        self.airports = list(airports)
+        self.airport_ids = {name: i for i, name in enumerate(self.airports)}
+        self.out_offsets = out_offsets
+        self.out_departures = out_departures
+        self.out_arrivals = out_arrivals
+        self.out_targets = out_targets
+        self.in_offsets = in_offsets
+        self.in_arrivals = in_arrivals
+        self.in_departures = in_departures
+        self.in_sources = in_sources
+        self._cache = {}
 
-    def __init__(self, u, v, weight):
+    @classmethod
+    def from_flights(cls, P):
         """
-        Appends a vertex to the list of vertices.
+        Builds the time-dependent graph of a list of flights in O(E log E).
 
         Args:
-            u: The starting vertex.
-            t: The timestamp of the vertex.
+            P: An iterable of flights, where each flight is a tuple (u, v, t, l).
+
+        Returns:
+            TimeDependentGraph: The time-dependent graph.
         """
-        self.u = u
-        self.v = v
-        self.weight = weight
+        return cls.from_arrays(*_flight_arrays(P))
 
+    @classmethod
+    def from_arrays(cls, airports, src, dst, dep, dur):
+        """
+        Builds the time-dependent graph of flights given as parallel arrays.
 
-def buildGraph(P):
+        Args:
+            airports (list): Airport names, indexed by airport id.
+            src (np.ndarray): Departure airport id of each flight.
+            dst (np.ndarray): Arrival airport id of each flight.
+            dep (np.ndarray): Departure time of each flight.
+            dur (np.ndarray): Duration of each flight.
+
+        Returns:
+            TimeDependentGraph: The time-dependent graph.
+
+        Raises:
+            ValueError: If a flight has a negative duration, which the
+                time-dependent searches do not support.
+        """
+        if len(dur) and dur.min() < 0:
+            raise ValueError("A time-dependent graph needs flights of non-negative duration")
+
+        keep = (src != dst) | (dur != 0)
+        src, dst, dep = src[keep], dst[keep], dep[keep]
+        arr = dep + dur[keep]
+        nb_airports = len(airports)
+
+        out_order = np.lexsort((arr, dep, src))
+        in_order = np.lexsort((dep, arr, dst))
+        out_offsets, in_offsets = (
+            np.zeros(nb_airports + 1, dtype=np.int64) for _ in range(2)
+        )
+        np.cumsum(np.bincount(src, minlength=nb_airports), out=out_offsets[1:])
+        np.cumsum(np.bincount(dst, minlength=nb_airports), out=in_offsets[1:])
+
+        return cls(
+            airports,
+            out_offsets,
+            _compact(dep[out_order]),
+            _compact(arr[out_order]),
+            _compact(dst[out_order]),
+            in_offsets,
+            _compact(arr[in_order]),
+            _compact(dep[in_order]),
+            _compact(src[in_order]),
+        )
+
+    @property
+    def num_flights(self):
+        """int: The number of flights."""
+        return len(self.out_targets)
+
+    @property
+    def nbytes(self):
+        """int: The number of bytes of the arrays, cached lists excluded."""
+        return sum(
+            array.nbytes
+            for array in (
+                self.out_offsets,
+                self.out_departures,
+                self.out_arrivals,
+                self.out_targets,
+                self.in_offsets,
+                self.in_arrivals,
+                self.in_departures,
+                self.in_sources,
+            )
+        )
+
+    def first_time(self, a):
+        """
+        Returns the first time an airport appears in a flight, the time of its
+        first copy in G tilde.
+
+        Args:
+            a (int): The airport id.
+
+        Returns:
+            int or None: The time, or None if no flight uses the airport.
+        """
+        times = []
+
+        if self.out_offsets[a] < self.out_offsets[a + 1]:
+            times.append(int(self.out_departures[self.out_offsets[a]]))
+
+        if self.in_offsets[a] < self.in_offsets[a + 1]:
+            times.append(int(self.in_arrivals[self.in_offsets[a]]))
+
+        return min(times, default=None)
+
+    def departures(self):
+        """
+        Returns the flights sorted by departure airport then departure time, as
+        lists built once and cached.
+
+        Returns:
+            tuple: The lists of offsets, departure times, arrival times and
+                arrival airport ids.
+        """
+        if "departures" not in self._cache:
+            self._cache["departures"] = (
+                self.out_offsets.tolist(),
+                self.out_departures.tolist(),
+                self.out_arrivals.tolist(),
+                self.out_targets.tolist(),
+            )
+
+        return self._cache["departures"]
+
+    def arrivals(self):
+        """
+        Returns the flights sorted by arrival airport then arrival time, as
+        lists built once and cached.
+
+        Returns:
+            tuple: The lists of offsets, arrival times, departure times and
+                departure airport ids.
+        """
+        if "arrivals" not in self._cache:
+            self._cache["arrivals"] = (
+                self.in_offsets.tolist(),
+                self.in_arrivals.tolist(),
+                self.in_departures.tolist(),
+                self.in_sources.tolist(),
+            )
+
+        return self._cache["arrivals"]
+
+
+@instrumentation.instrumented
+def build_time_dependent_graph(P, airports=None):
     """
-    Builds a graph based on a list of input data.
+    Builds the time-dependent graph of a list of flights.
 
     Args:
-        P: A list of input data, where each element is a tuple containing u, v, t, and l.
+        P: A list of input data, where each element is a tuple containing u, v, t, and l,
+            or a structured array as returned by utils.load_flights.
+        airports (list, optional): The airport names the u and v fields of a
+            structured array refer to.
 
     Returns:
-        A tuple containing the list of vertices and the list of edges.
+        TimeDependentGraph: The time-dependent graph.
     """
+    if isinstance(P, np.ndarray):
+        return TimeDependentGraph.from_arrays(
+            airports,
+            P["u"].astype(np.int64),
+            P["v"].astype(np.int64),
+            P["t"].astype(np.int64),
+            P["l"].astype(np.int64),
+        )
 
-    edges = []
-    vertices = []
+    return TimeDependentGraph.from_flights(P)
+
+
+GRAPH_MAGIC = b"MOGPLTEG"
+GRAPH_FORMAT_VERSION = 1
+GRAPH_ARRAYS = (
+    "vertex_airport",
+    "vertex_time",
+    "out_offsets",
+    "out_targets",
+    "out_weights",
+    "in_offsets",
+    "in_sources",
+    "in_weights",
+    "airport_offsets",
+    "airport_vertices",
+)
+# the cached indexes over the flights, patched in place by the flight updates
+FLIGHT_INDEXES = (
+    ("connections", "departure"),
+    ("connections", "arrival"),
+    "departures",
+    "arrivals",
+    "min_weight",
+)
+LANDMARK_ARRAYS = ("landmark_airports", "landmark_to", "landmark_from")
+_ALIGNMENT = 64
+
+
+def _align(offset):
+    return -(-offset // _ALIGNMENT) * _ALIGNMENT
+
+
+def save_graph(G, path, source_hash=None):
+    """
+    Saves a time-expanded graph to a binary file that load_graph can memory-map.
+
+    The file holds a magic string, the length of a JSON header, the header
+    itself (airport names, source hash and the dtype, length and offset of
+    every array), then the raw arrays, each aligned on 64 bytes. The landmark
+    tables of the graph, if they are up to date, are saved as three more
+    arrays, which readers that do not know them ignore.
 
-    for i in P:
-        u, v, t, l = i
+    Args:
+        G (TimeExpandedGraph): The time-expanded graph.
+        path (str): The path of the file to write.
+        source_hash (str, optional): The hash of the timetable the graph was built from.
+    """
+    names = GRAPH_ARRAYS
+    arrays = [np.ascontiguousarray(getattr(G, name)) for name in GRAPH_ARRAYS]
+
+    if G.landmarks is not None and G.landmarks.version == G.version:
+        names += LANDMARK_ARRAYS
+        arrays += [
+            np.ascontiguousarray(G.landmarks.airports, dtype=np.int64),
+            np.ascontiguousarray(G.landmarks.to_landmark, dtype=np.float64).ravel(),
+            np.ascontiguousarray(G.landmarks.from_landmark, dtype=np.float64).ravel(),
+        ]
+    header = {
+        "version": GRAPH_FORMAT_VERSION,
+        "source_hash": source_hash,
+        "airports": G.airports,
+        "arrays": {},
+    }
+
+    # the offsets depend on the header length, which depends on the offsets
+    # digits, so the layout is computed until it is stable
+    data_start = 0
+    while True:
+        offset = data_start
+        for name, array_ in zip(names, arrays):
+            offset = _align(offset)
+            header["arrays"][name] = [array_.dtype.str, len(array_), offset]
+            offset += array_.nbytes
+        encoded = json.dumps(header).encode()
+        if _align(len(GRAPH_MAGIC) + 8 + len(encoded)) == data_start:
+            break
+        data_start = _align(len(GRAPH_MAGIC) + 8 + len(encoded))
+
+    # a unique temporary file, so that two processes saving the same graph
+    # never write to the same file
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)))
+
+    with os.fdopen(fd, "wb") as f:
+        f.write(GRAPH_MAGIC)
+        f.write(len(encoded).to_bytes(8, "little"))
+        f.write(encoded)
+
+        for name, array_ in zip(names, arrays):
+            f.write(b"\0" * (header["arrays"][name][2] - f.tell()))
+            array_.tofile(f)
+
+    # readers never see a partially written file
+    os.replace(tmp_path, path)
+
+
+def read_graph_header(path):
+    """
+    Reads the header of a file written by save_graph.
+
+    Args:
+        path (str): The path of the file.
+
+    Returns:
+        dict: The header.
+
+    Raises:
+        ValueError: If the file is not a graph file of a supported version, or
+            if its header is corrupt.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(GRAPH_MAGIC)) != GRAPH_MAGIC:
+            raise ValueError(f"{path} is not a time-expanded graph file")
+
+        length = int.from_bytes(f.read(8), "little")
+
+        try:
+            header = json.loads(f.read(length))
+        except (UnicodeDecodeError, json.JSONDecodeError) as error:
+            raise ValueError(f"{path} has a corrupt header") from error
+
+    if header.get("version") != GRAPH_FORMAT_VERSION:
+        raise ValueError(f"{path} has unsupported format version {header.get('version')}")
+
+    return header
+
+
+def load_graph(path, mmap=True):
+    """
+    Opens a time-expanded graph saved by save_graph, without any parsing step.
 
-        if (u, t) not in vertices:
-            vertices.append((u, t))
+    Args:
+        path (str): The path of the file.
+        mmap (bool): Whether to memory-map the arrays, so that they are paged in
+            on demand and shared between the processes opening the same file,
+            or to read them in memory.
+
+    Returns:
+        TimeExpandedGraph: The time-expanded graph, with its landmark tables if
+            they were saved.
+
+    Raises:
+        ValueError: If the file is not a graph file of a supported version, or
+            if it is corrupt or truncated.
+    """
+    header = read_graph_header(path)
+    size = os.path.getsize(path)
+    arrays = {}
+
+    names = GRAPH_ARRAYS + tuple(
+        name for name in LANDMARK_ARRAYS if name in header["arrays"]
+    )
 
-        if (v, t + l) not in vertices:
-            vertices.append((v, t + l))
+    for name in names:
+        if name not in header["arrays"]:
+            raise ValueError(f"{path} has no {name} array")
 
-        edge = Edge((u, t), (v, t + l), l)
+        dtype, length, offset = header["arrays"][name]
 
-        edges.append(edge)
+        if offset + length * np.dtype(dtype).itemsize > size:
+            raise ValueError(f"{path} is truncated")
 
-    clustered_vertices = collections.defaultdict(list)
+        if length == 0:
+            arrays[name] = np.empty(0, dtype=dtype)
+        elif mmap:
+            arrays[name] = np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(length,))
+        else:
+            arrays[name] = np.fromfile(path, dtype=dtype, count=length, offset=offset)
 
-    for e in vertices:
-        clustered_vertices[e[0]].append(e)
+    landmarks = [arrays.pop(name, None) for name in LANDMARK_ARRAYS]
+    G = TimeExpandedGraph(header["airports"], **arrays)
 
-    for i, value in clustered_vertices.items():
-        edges.extend(
-            Edge(clustered_vertices[i][j], clustered_vertices[i][j + 1], 0)
-            for j in range(len(value) - 1)
+    if landmarks[0] is not None:
+        shape = (len(landmarks[0]), len(G.airports))
+        G.landmarks = Landmarks(
+            landmarks[0], landmarks[1].reshape(shape), landmarks[2].reshape(shape)
         )
 
-    return vertices, edges
+    return G
+
+
+def file_hash(name):
+    """
+    Computes the SHA-256 hash of a file, reading it by blocks.
+
+    Args:
+        name (str): The path of the file.
+
+    Returns:
+        str: The hexadecimal digest.
+    """
+    digest = hashlib.sha256()
+
+    with open(name, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+def cached_graph(name, cache_dir=None, mmap=True):
+    """
+    Returns the time-expanded graph of a timetable file, through an on-disk cache.
+
+    The cache file is named after the timetable and the hash of its content,
+    so a modified timetable misses the cache and is rebuilt, and the caches of
+    its previous versions are deleted.
+
+    Args:
+        name (str): The path of the timetable file.
+        cache_dir (str, optional): The directory of the cache files, defaults to
+            the directory of the timetable.
+        mmap (bool): Whether to memory-map the arrays of the graph.
+
+    Returns:
+        TimeExpandedGraph: The time-expanded graph.
+    """
+    cache_dir = cache_dir or os.path.dirname(os.path.abspath(name))
+    stem = os.path.basename(name)
+    source_hash = file_hash(name)
+    path = os.path.join(cache_dir, f"{stem}.{source_hash[:16]}.teg")
+
+    if not os.path.exists(path):
+        airports, flights = utils.load_flights(name)
+        save_graph(build_time_expanded_graph(flights, airports), path, source_hash)
+
+        # only the caches of this timetable, not those of a timetable whose
+        # name starts with the same stem
+        pattern = re.compile(re.escape(stem) + r"\.[0-9a-f]{16}\.teg")
+
+        for entry in os.listdir(cache_dir):
+            if pattern.fullmatch(entry) and entry != os.path.basename(path):
+                os.remove(os.path.join(cache_dir, entry))
+
+    return load_graph(path, mmap)
 
 
 def generate_graph_G(nb_vertices, nb_edges):
@@ -99,3 +1865,178 @@ def generate_graph_G(nb_vertices, nb_edges):
         G.append(edge)
 
     return G
+
+
+TOPOLOGIES = ("uniform", "hub", "scale_free")
+
+
+def _generate_routes(rng, nb_airports, nb_flights, topology, nb_hubs, hub_share, exponent):
+    """
+    Draws the departure and arrival airports of the flights of a synthetic network.
+
+    Args:
+        rng (np.random.Generator): The random generator.
+        nb_airports (int): The number of airports, at least 2.
+        nb_flights (int): The number of flights.
+        topology (str): One of TOPOLOGIES.
+        nb_hubs (int): The number of hubs of the hub topology.
+        hub_share (float): The share of hub to hub flights of the hub topology.
+        exponent (float): The exponent of the popularity of the scale_free topology.
+
+    Returns:
+        tuple: The arrays of departure and arrival airport ids.
+    """
+    if topology == "uniform":
+        src = rng.integers(0, nb_airports, nb_flights)
+        # skipping the departure airport keeps the arrival uniform among the others
+        dst = rng.integers(0, nb_airports - 1, nb_flights)
+        dst += dst >= src
+
+        return src, dst
+
+    if topology == "hub":
+        # airports 0 to nb_hubs - 1 are the hubs, every other airport is a
+        # spoke served by a single home hub
+        nb_hubs = min(max(nb_hubs, 1), nb_airports - 1)
+        src = np.empty(nb_flights, dtype=np.int64)
+        dst = np.empty(nb_flights, dtype=np.int64)
+        between_hubs = rng.random(nb_flights) < (hub_share if nb_hubs > 1 else 0)
+        n = np.count_nonzero(between_hubs)
+        src[between_hubs] = rng.integers(0, nb_hubs, n)
+        dst[between_hubs] = rng.integers(0, nb_hubs - 1, n)
+        dst[between_hubs] += dst[between_hubs] >= src[between_hubs]
+
+        spokes = ~between_hubs
+        n = nb_flights - n
+        spoke = rng.integers(nb_hubs, nb_airports, n)
+        hub = spoke % nb_hubs
+        outbound = rng.random(n) < 0.5
+        src[spokes] = np.where(outbound, hub, spoke)
+        dst[spokes] = np.where(outbound, spoke, hub)
+
+        return src, dst
+
+    if topology == "scale_free":
+        # the popularity of the k-th airport decreases as a power of its rank
+        weights = np.arange(1, nb_airports + 1, dtype=np.float64) ** -exponent
+        cumulative = np.cumsum(weights)
+        cumulative /= cumulative[-1]
+        src = np.searchsorted(cumulative, rng.random(nb_flights), side="right")
+        dst = np.searchsorted(cumulative, rng.random(nb_flights), side="right")
+        # a flight drawn to its own departure airport goes to a uniform other one
+        loop = src == dst
+        dst[loop] = rng.integers(0, nb_airports - 1, np.count_nonzero(loop))
+        dst[loop] += dst[loop] >= src[loop]
+
+        return src, dst
+
+    raise ValueError(f"Unknown topology {topology!r}, expected one of {TOPOLOGIES}")
+
+
+def _generate_departures(rng, nb_flights, horizon, departures, nb_peaks, spread):
+    """
+    Draws the departure times of the flights of a synthetic network.
+
+    Args:
+        rng (np.random.Generator): The random generator.
+        nb_flights (int): The number of flights.
+        horizon (int): The departure times are drawn in [1, horizon].
+        departures (str): "uniform", or "peaks" for departures grouped around
+            nb_peaks evenly spaced times.
+        nb_peaks (int): The number of peaks.
+        spread (float): The standard deviation of the departures around a peak.
+
+    Returns:
+        np.ndarray: The departure times.
+    """
+    if departures == "uniform":
+        return rng.integers(1, horizon + 1, nb_flights)
+
+    if departures == "peaks":
+        period = horizon / nb_peaks
+        centers = (rng.integers(0, nb_peaks, nb_flights) + 0.5) * period
+        times = np.rint(centers + rng.normal(0, spread, nb_flights)).astype(np.int64)
+
+        return np.clip(times, 1, horizon)
+
+    raise ValueError(f"Unknown departure distribution {departures!r}")
+
+
+def generate_network(
+    nb_airports,
+    nb_flights,
+    topology="hub",
+    nb_hubs=None,
+    hub_share=0.2,
+    exponent=1.0,
+    horizon=14,
+    durations=(1, 1),
+    departures="uniform",
+    nb_peaks=None,
+    spread=1.0,
+    seed=None,
+    as_tuples=False,
+):
+    """
+    Generates a random airline network with numpy, in O(nb_flights).
+
+    The airports are named s0, s1, ... as in generate_graph_G.
+
+    Args:
+        nb_airports (int): The number of airports, at least 2.
+        nb_flights (int): The number of flights.
+        topology (str): "uniform" for uniformly drawn routes, "hub" for a
+            hub-and-spoke network where every spoke is served by one of the
+            hubs s0 to s{nb_hubs - 1}, or "scale_free" for airports whose
+            popularity decreases as a power of their rank.
+        nb_hubs (int, optional): The number of hubs, defaults to one airport in 20.
+        hub_share (float): The share of hub to hub flights of the hub topology.
+        exponent (float): The exponent of the popularity of the scale_free topology.
+        horizon (int): The departure times are drawn in [1, horizon].
+        durations (tuple): The smallest and largest flight durations, drawn uniformly.
+        departures (str): "uniform", or "peaks" for departures grouped around
+            nb_peaks evenly spaced times.
+        nb_peaks (int, optional): The number of peaks, defaults to the horizon.
+        spread (float): The standard deviation of the departures around a peak.
+        seed (int, optional): The seed of the random generator.
+        as_tuples (bool): Whether to return the flights as a list of (u, v, t, l)
+            tuples rather than as a structured array.
+
+    Returns:
+        tuple or list: The list of airport names and the array of flights, of
+            dtype utils.FLIGHT_DTYPE, which build_time_expanded_graph takes
+            directly, or the list of flights if as_tuples is set.
+    """
+    if nb_airports < 2:
+        raise ValueError("A network needs at least 2 airports")
+
+    rng = np.random.default_rng(seed)
+    src, dst = _generate_routes(
+        rng,
+        nb_airports,
+        nb_flights,
+        topology,
+        max(nb_airports // 20, 1) if nb_hubs is None else nb_hubs,
+        hub_share,
+        exponent,
+    )
+    dep = _generate_departures(
+        rng, nb_flights, horizon, departures, nb_peaks or horizon, spread
+    )
+
+    flights = np.empty(nb_flights, dtype=utils.FLIGHT_DTYPE)
+    flights["u"] = src
+    flights["v"] = dst
+    flights["t"] = dep
+    flights["l"] = rng.integers(durations[0], durations[1] + 1, nb_flights)
+    airports = [f"s{i}" for i in range(nb_airports)]
+
+    if as_tuples:
+        return [
+            (airports[u], airports[v], t, l)
+            for u, v, t, l in zip(
+                src.tolist(), dst.tolist(), dep.tolist(), flights["l"].tolist()
+            )
+        ]
+
+    return airports, flights
@@ -1,116 +1,116 @@
-from gurobipy import Model, GRB, LinExpr
-from collections import defaultdict
+import numpy as np
+from gurobipy import Model, GRB
 
+from graph import TimeExpandedGraph
+from lp_backends import LPSession, incidence_matrix, supply_vector, path_from_flow
 
-def gurobi(e, a, s, d):
+
+def build_model(G, source, sink, lp_file=None):
+    """
+    Builds the shortest path model of a time-expanded graph with the matrix API.
+
+    Args:
+        G (TimeExpandedGraph): The time-expanded graph.
+        source (int): The vertex id the flow leaves.
+        sink (int): The vertex id the flow reaches.
+        lp_file (str, optional): The path of a file to export the model to in LP format.
+
+    Returns:
+        tuple: The model and the MVar of the arc variables, indexed like the edges of G.
+    """
+    model = Model("spp problem")
+    model.Params.LogToConsole = 0
+
+    # add decision variables
+    x = model.addMVar(G.num_edges, vtype=GRB.BINARY, name="x")
+
+    # add objective function
+    model.setObjective(G.edge_weight.astype(float) @ x, GRB.MINIMIZE)
+
+    # flow conservation, one unit leaves the source and reaches the sink
+    model.addMConstr(
+        incidence_matrix(G), x, "=", supply_vector(G, source, sink), name="flow"
+    )
+
+    if lp_file is not None:
+        model.write(lp_file)
+
+    return model, x
+
+
+def gurobi(e, a, s, d, lp_file=None):
     """
     Solves the shortest path problem using the Gurobi optimization solver.
 
+    The flow leaves the first copy of the source vertex and reaches the last
+    copy of the destination vertex, as in pathfinding.type_4.
+
     Args:
-        e (list): A list of edges in the graph.
-        a (list): A list of weighted arcs in the graph.
+        e (list or TimeExpandedGraph): A list of edges in the graph.
+        a (list or None): A list of weighted arcs in the graph.
         s (str): The source vertex.
         d (str): The destination vertex.
+        lp_file (str, optional): The path of a file to export the model to in LP format.
 
     Returns:
         tuple: A tuple containing the path in the graph and the objective value of the model.
     """
-    Nodes = []
-
-    for j in e:
-        m, n = j
-        Nodes.append(str(m + str(n)))
+    G = e if isinstance(e, TimeExpandedGraph) else TimeExpandedGraph.from_lists(e, a)
+    source, sink = G.first_copy(s), G.last_copy(d)
 
-    Arcs = {}
+    if source is None or sink is None:
+        print("No path found")
 
-    for edge in a:
-        a1, b1 = (edge.u[0], edge.u[1])
-        t = str(a1 + str(b1))
-        c1, d1 = (edge.v[0], edge.v[1])
-        v = str(c1 + str(d1))
-        v2 = edge.weight
-        Arcs[(t, v)] = v2
+        return [], float("inf")
 
-    model = Model("spp problem")
-    model.Params.LogToConsole = 0
+    model, x = build_model(G, source, sink, lp_file)
+    model.optimize()
 
-    clustered_vertices = defaultdict(list)
+    if model.Status != GRB.OPTIMAL:
+        print("No path found")
 
-    for i in e:
-        clustered_vertices[i[0]].append(i)
+        return [], float("inf")
 
-    a2, b2 = clustered_vertices[s][0]
-    c2, d2 = clustered_vertices[d][0]
-    depart = str(a2 + str(b2))
-    arrive = str(c2 + str(d2))
+    # all the solution values at once, indexed by arc id
+    return path_from_flow(G, x.X, source, sink), model.ObjVal
 
-    # add decision variables
-    X = {}
-    for key in Arcs.keys():
-        index = key[0] + "," + key[1]
-        X[key] = model.addVar(vtype=GRB.BINARY, name=index)
 
-    # add objective function
-    obj = LinExpr(0)
-
-    for key in Arcs.keys():
-        obj.addTerms(Arcs[key], X[key])
-
-    model.setObjective(obj, GRB.MINIMIZE)
-
-    # constraint1 1 and constraint 2
-    lhs_1 = LinExpr(0)
-    lhs_2 = LinExpr(0)
-
-    for key in Arcs.keys():
-        if key[0] == depart:
-            lhs_1.addTerms(1, X[key])
-        elif key[1] == arrive:
-            lhs_2.addTerms(1, X[key])
-
-    model.addConstr(lhs_1 == 1, name="start flow")
-    model.addConstr(lhs_2 == 1, name="end flow")
-
-    # constraints 3
-    for node in Nodes:
-        lhs = LinExpr(0)
-        if node != depart and node != arrive:
-            for key in Arcs.keys():
-                if key[1] == node:
-                    lhs.addTerms(1, X[key])
-                elif key[0] == node:
-                    lhs.addTerms(-1, X[key])
-        model.addConstr(lhs == 0, name="flow conservation")
-
-    model.write("model_spp.lp")
-    model.optimize()
+class SolverSession(LPSession):
+    """
+    Gurobi model of the shortest path problem, built once per graph.
 
-    li = []
-    li.append(depart)
+    The arc variables are continuous, the incidence matrix being totally
+    unimodular. Each query only changes the right-hand side of the flow
+    conservation constraints of the previous and new endpoints, and Gurobi
+    re-solves with the dual simplex from the basis of the previous query.
+    """
 
-    for var in model.getVars():
-        if var.x > 0:
-            t1, t2 = (var.varName).split(",")
-            if t1 != depart and t2 != arrive:
-                li.append(t1)
-                li.append(t2)
-    li.append(arrive)
+    def __init__(self, G):
+        super().__init__(G)
+        self.model = Model("spp session")
+        self.model.Params.LogToConsole = 0
+        # dual simplex, the previous basis stays dual feasible when only the RHS changes
+        self.model.Params.Method = 1
 
-    b = {}
-    b = b.fromkeys(li)
-    c = list(b.keys())
+        self._x = self.model.addMVar(G.num_edges, lb=0, ub=1, name="x")
+        self.model.setObjective(G.edge_weight.astype(float) @ self._x, GRB.MINIMIZE)
+        self._constrs = self.model.addMConstr(
+            incidence_matrix(G), self._x, "=", np.zeros(G.num_vertices), name="flow"
+        ).tolist()
+        self._endpoints = ()
 
-    tmp = []
+    def solve_flow(self, source, sink):
+        supply = dict.fromkeys(self._endpoints, 0)
+        supply[source] = supply.get(source, 0) + 1
+        supply[sink] = supply.get(sink, 0) - 1
 
-    for i in c:
-        ab, cd = list(i)
-        tmp.append((str(ab), int(cd)))
+        for vertex, value in supply.items():
+            self._constrs[vertex].RHS = value
+        self._endpoints = (source, sink)
 
-    path_in_G = []
+        self.model.optimize()
 
-    for vertex in range(len(tmp) - 1):
-        if tmp[vertex][0] != tmp[vertex + 1][0]:
-            edge = (tmp[vertex][0], tmp[vertex + 1][0], tmp[vertex][1], 1)
-            path_in_G.append(edge)
+        if self.model.Status != GRB.OPTIMAL:
+            return None
 
-    return path_in_G, model.ObjVal
+        return self._x.X, self.model.ObjVal
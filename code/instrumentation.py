@@ -0,0 +1,231 @@
+import cProfile
+import collections
+import contextlib
+import functools
+import logging
+import pstats
+import time
+
+
+_sinks = []
+_current = None
+_NO_PHASE = contextlib.nullcontext()
+
+
+class QueryStats:
+    """
+    Measurements of one call to an instrumented function.
+
+    Attributes:
+        name (str): The name of the instrumented function.
+        args (tuple): The positional arguments of the call.
+        duration (float): The duration of the call in seconds.
+        timings (dict): The time spent in each phase, in seconds.
+        counters (collections.Counter): The iteration and relaxation counters.
+        profile (pstats.Stats or None): The profile of the call, when a sink
+            asked for one.
+    """
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+        self.duration = 0.0
+        self.timings = collections.defaultdict(float)
+        self.counters = collections.Counter()
+        self.profile = None
+
+    def __repr__(self):
+        return (
+            f"QueryStats({self.name}, {self.duration * 1000:.3f} ms, "
+            f"timings={dict(self.timings)}, counters={dict(self.counters)})"
+        )
+
+
+class _Phase:
+    """Context manager adding the time spent in a block to a phase of the current call."""
+
+    def __init__(self, stats, name):
+        self._stats = stats
+        self._name = name
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+
+    def __exit__(self, *args):
+        self._stats.timings[self._name] += time.perf_counter() - self._t0
+
+
+def add_sink(sink):
+    """
+    Enables the instrumentation, sending the stats of every call to a sink.
+
+    Args:
+        sink (Callable): Called with the QueryStats of each instrumented call.
+            A sink with a true profile attribute also gets the calls profiled
+            with cProfile.
+    """
+    _sinks.append(sink)
+
+
+def remove_sink(sink):
+    """
+    Stops sending the stats to a sink, the instrumentation is disabled once
+    there is no sink left.
+
+    Args:
+        sink (Callable): A sink passed to add_sink.
+    """
+    _sinks.remove(sink)
+
+
+@contextlib.contextmanager
+def enabled(sink):
+    """
+    Enables the instrumentation with a sink within a with block.
+
+    Args:
+        sink (Callable): Called with the QueryStats of each instrumented call.
+    """
+    add_sink(sink)
+
+    try:
+        yield sink
+    finally:
+        remove_sink(sink)
+
+
+def active():
+    """
+    Returns the stats of the instrumented call in progress.
+
+    Returns:
+        QueryStats or None: The stats, or None if the instrumentation is disabled.
+    """
+    return _current
+
+
+def phase(name):
+    """
+    Times a block as a phase of the instrumented call in progress.
+
+    Args:
+        name (str): The name of the phase, such as "cluster", "search" or "path".
+
+    Returns:
+        A context manager, which does nothing when the instrumentation is disabled.
+    """
+    if _current is None:
+        return _NO_PHASE
+
+    return _Phase(_current, name)
+
+
+def count(name, n=1):
+    """
+    Adds to a counter of the instrumented call in progress.
+
+    Args:
+        name (str): The name of the counter.
+        n (int): The amount to add.
+    """
+    if _current is not None:
+        _current.counters[name] += n
+
+
+def instrumented(func):
+    """
+    Decorates a function so that its calls are measured when the instrumentation is enabled.
+
+    When it is disabled the wrapper only checks that there is no sink. Calls
+    made by an instrumented function are measured as part of it rather than
+    reported separately.
+
+    Args:
+        func (Callable): The function to instrument.
+
+    Returns:
+        Callable: The instrumented function.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        global _current
+
+        if not _sinks or _current is not None:
+            return func(*args, **kwargs)
+
+        stats = _current = QueryStats(func.__name__, args)
+        profile = any(getattr(sink, "profile", False) for sink in _sinks)
+        profiler = cProfile.Profile() if profile else None
+        t0 = time.perf_counter()
+
+        try:
+            if profiler is None:
+                result = func(*args, **kwargs)
+            else:
+                result = profiler.runcall(func, *args, **kwargs)
+        finally:
+            stats.duration = time.perf_counter() - t0
+            _current = None
+
+        if profiler is not None:
+            stats.profile = pstats.Stats(profiler)
+
+        for sink in list(_sinks):
+            sink(stats)
+
+        return result
+
+    return wrapper
+
+
+def logging_sink(logger=None, level=logging.INFO):
+    """
+    Creates a sink writing the stats of each call to a logger.
+
+    Args:
+        logger (logging.Logger, optional): The logger, defaults to the logger
+            of this module.
+        level (int): The logging level of the records.
+
+    Returns:
+        Callable: The sink.
+    """
+    logger = logger or logging.getLogger(__name__)
+
+    def sink(stats):
+        logger.log(level, "%r", stats)
+
+    return sink
+
+
+class ProfileSink:
+    """
+    Sink profiling the instrumented calls with cProfile and accumulating the profiles.
+
+    Attributes:
+        profile (bool): Always True, asks the instrumented calls to be profiled.
+        stats (pstats.Stats or None): The accumulated profile of the calls.
+    """
+
+    profile = True
+
+    def __init__(self):
+        self.stats = None
+
+    def __call__(self, stats):
+        if self.stats is None:
+            self.stats = stats.profile
+        else:
+            self.stats.add(stats.profile)
+
+    def print_stats(self, *restrictions, sort="cumulative"):
+        """
+        Prints the accumulated profile.
+
+        Args:
+            *restrictions: The restrictions passed to pstats.Stats.print_stats.
+            sort (str): The key the functions are sorted by.
+        """
+        if self.stats is not None:
+            self.stats.sort_stats(sort).print_stats(*restrictions)
@@ -0,0 +1,307 @@
+import collections
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.optimize import linprog
+
+from graph import TimeExpandedGraph
+
+
+def incidence_matrix(G):
+    """
+    Builds the node-arc incidence matrix of a time-expanded graph.
+
+    Args:
+        G (TimeExpandedGraph): The time-expanded graph.
+
+    Returns:
+        scipy.sparse.csr_matrix: The matrix with a row per vertex and a column per
+            arc, holding 1 at the tail of each arc and -1 at its head.
+    """
+    nb_arcs = G.num_edges
+    arcs = np.arange(nb_arcs)
+
+    return sp.csr_matrix(
+        (
+            np.concatenate([np.ones(nb_arcs), -np.ones(nb_arcs)]),
+            (np.concatenate([G.edge_u, G.edge_v]), np.concatenate([arcs, arcs])),
+        ),
+        shape=(G.num_vertices, nb_arcs),
+    )
+
+
+def supply_vector(G, source, sink):
+    """
+    Builds the right-hand side of the flow conservation constraints.
+
+    Args:
+        G (TimeExpandedGraph): The time-expanded graph.
+        source (int): The vertex id the flow leaves.
+        sink (int): The vertex id the flow reaches.
+
+    Returns:
+        np.ndarray: 1 at the source, -1 at the sink and 0 elsewhere.
+    """
+    supply = np.zeros(G.num_vertices)
+    supply[source] += 1
+    supply[sink] -= 1
+
+    return supply
+
+
+def path_from_flow(G, flow, source, sink):
+    """
+    Converts the optimal flow of a solver into the flights of the path in G.
+
+    The path is rebuilt by walking the arcs carrying the flow from the source
+    to the sink, each arc being used at most once. The optimal flow may also
+    carry zero-cost cycles, made of zero duration return flights; those off
+    the path are never reached, and those touching it are cut out of the path
+    as soon as the walk comes back to one of its vertices.
+
+    Args:
+        G (TimeExpandedGraph): The time-expanded graph.
+        flow (np.ndarray): The flow on each arc, indexed like the edges of G.
+        source (int): The vertex id the flow leaves.
+        sink (int): The vertex id the flow reaches.
+
+    Returns:
+        list: A list of edges (u, v, t, l) representing the path.
+
+    Raises:
+        ValueError: If the flow does not carry a unit from the source to the sink.
+    """
+    selected = np.flatnonzero(np.asarray(flow) > 0.5)
+    out_arcs = collections.defaultdict(list)
+
+    for u, v in zip(G.edge_u[selected].tolist(), G.edge_v[selected].tolist()):
+        out_arcs[u].append(v)
+
+    path = [source]
+    position = {source: 0}
+
+    while path[-1] != sink:
+        if not out_arcs[path[-1]]:
+            raise ValueError("The flow does not reach the sink")
+
+        v = out_arcs[path[-1]].pop()
+
+        if v in position:
+            for u in path[position[v] + 1 :]:
+                del position[u]
+            del path[position[v] + 1 :]
+        else:
+            position[v] = len(path)
+            path.append(v)
+
+    vertex_airport, vertex_time = G.vertex_airport, G.vertex_time
+    path_in_G = []
+
+    for u, v in zip(path, path[1:]):
+        if vertex_airport[u] != vertex_airport[v]:
+            edge = (
+                G.airports[vertex_airport[u]],
+                G.airports[vertex_airport[v]],
+                int(vertex_time[u]),
+                int(vertex_time[v] - vertex_time[u]),
+            )
+            path_in_G.append(edge)
+
+    return path_in_G
+
+
+def flow_endpoints(G, s, d):
+    """
+    Returns the vertices the flow of a type IV query leaves and reaches.
+
+    Args:
+        G (TimeExpandedGraph): The time-expanded graph.
+        s (str): The source vertex.
+        d (str): The destination vertex.
+
+    Returns:
+        tuple or None: The ids of the first copy of s and of the last copy of d,
+            or None if one of them is not in the graph.
+    """
+    source, sink = G.first_copy(s), G.last_copy(d)
+
+    if source is None or sink is None:
+        return None
+
+    return source, sink
+
+
+class LPBackend:
+    """
+    Base class of the linear programming solvers of the type IV path problem.
+
+    The shortest path is a minimum cost flow of one unit from the first copy
+    of the source to the last copy of the destination. The incidence matrix
+    is totally unimodular, so the LP relaxation has an integral optimum and
+    backends can solve it without binary variables.
+
+    Attributes:
+        name (str): The name of the backend.
+    """
+
+    name = None
+
+    def solve(self, e, a, s, d):
+        """
+        Solves the shortest path problem.
+
+        Args:
+            e (list or TimeExpandedGraph): A list of edges in the graph.
+            a (list or None): A list of weighted arcs in the graph.
+            s (str): The source vertex.
+            d (str): The destination vertex.
+
+        Returns:
+            tuple: A tuple containing the path in the graph and the objective value.
+        """
+        G = e if isinstance(e, TimeExpandedGraph) else TimeExpandedGraph.from_lists(e, a)
+
+        return self.session(G).solve(s, d)
+
+    def session(self, G):
+        """
+        Creates a session solving repeated queries on one graph.
+
+        Args:
+            G (TimeExpandedGraph): The time-expanded graph.
+
+        Returns:
+            LPSession: The session.
+        """
+        raise NotImplementedError
+
+
+class LPSession:
+    """
+    Solves repeated shortest path queries on one graph.
+
+    Only the supply of the source and the sink change between two queries, so
+    a session builds what it can once, and only updates the right-hand side of
+    the flow conservation constraints for each query.
+
+    Attributes:
+        graph (TimeExpandedGraph): The time-expanded graph.
+    """
+
+    def __init__(self, G):
+        self.graph = G
+
+    def solve(self, s, d):
+        """
+        Solves the shortest path problem between two vertices.
+
+        Args:
+            s (str): The source vertex.
+            d (str): The destination vertex.
+
+        Returns:
+            tuple: A tuple containing the path in the graph and the objective value.
+        """
+        endpoints = flow_endpoints(self.graph, s, d)
+        solution = None if endpoints is None else self.solve_flow(*endpoints)
+
+        if solution is None:
+            print("No path found")
+
+            return [], float("inf")
+
+        flow, objective = solution
+
+        return path_from_flow(self.graph, flow, *endpoints), objective
+
+    def solve_flow(self, source, sink):
+        """
+        Solves the minimum cost flow problem between two vertices.
+
+        Args:
+            source (int): The vertex id the flow leaves.
+            sink (int): The vertex id the flow reaches.
+
+        Returns:
+            tuple or None: The flow on each arc and the objective value, or None
+                if the problem is infeasible.
+        """
+        raise NotImplementedError
+
+
+class HighsSession(LPSession):
+    """
+    Solves the LP relaxation with the HiGHS solver shipped with SciPy.
+
+    The costs and the incidence matrix are built once. linprog does not take
+    a starting basis, so each query is solved from scratch.
+    """
+
+    def __init__(self, G):
+        super().__init__(G)
+        self._costs = G.edge_weight.astype(float)
+        self._matrix = incidence_matrix(G)
+
+    def solve_flow(self, source, sink):
+        result = linprog(
+            self._costs,
+            A_eq=self._matrix,
+            b_eq=supply_vector(self.graph, source, sink),
+            bounds=(0, 1),
+            method="highs",
+        )
+
+        if result.status != 0:
+            return None
+
+        return result.x, result.fun
+
+
+class HighsBackend(LPBackend):
+    """Solves the LP relaxation with the HiGHS solver shipped with SciPy."""
+
+    name = "highs"
+
+    def session(self, G):
+        return HighsSession(G)
+
+
+class GurobiBackend(LPBackend):
+    """Solves the model with Gurobi, through gurobi_solver."""
+
+    name = "gurobi"
+
+    # gurobi_solver is imported on use so that the other backends work
+    # without a Gurobi install
+
+    def solve(self, e, a, s, d):
+        import gurobi_solver
+
+        return gurobi_solver.gurobi(e, a, s, d)
+
+    def session(self, G):
+        import gurobi_solver
+
+        return gurobi_solver.SolverSession(G)
+
+
+BACKENDS = {backend.name: backend for backend in (HighsBackend, GurobiBackend)}
+
+
+def get_backend(name):
+    """
+    Returns an instance of an LP backend.
+
+    Args:
+        name (str): The name of the backend, "highs" or "gurobi".
+
+    Returns:
+        LPBackend: The backend.
+
+    Raises:
+        ValueError: If there is no backend with this name.
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown LP backend: {name}")
+
+    return BACKENDS[name]()
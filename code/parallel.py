@@ -0,0 +1,103 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import graph
+from query import QuerySession
+
+
+_session = None
+
+
+def _init_worker(G):
+    """
+    Creates the query session of a worker process, once at worker start.
+
+    Args:
+        G (TimeExpandedGraph or str): The time-expanded graph shipped to the
+            worker, or the path of a graph file saved by graph.save_graph.
+    """
+    global _session
+
+    if isinstance(G, (str, os.PathLike)):
+        G = graph.load_graph(G)
+
+    _session = QuerySession(G)
+
+
+def _run_queries(queries):
+    """
+    Answers a chunk of queries in a worker process.
+
+    Args:
+        queries (list): The (start, end, kind) queries.
+
+    Returns:
+        list: The result of each query, in input order.
+    """
+    return _session.batch(queries)
+
+
+class QueryPool:
+    """
+    Answers batches of path queries with a pool of worker processes.
+
+    The algorithms are pure Python, so queries are spread over processes
+    rather than threads. The graph is pickled once per worker when the pool
+    starts, and each worker builds its own query session from it. Given the
+    path of a graph file instead, the workers memory-map it and share its
+    pages rather than each receiving a copy.
+
+    Attributes:
+        workers (int): The number of worker processes.
+        chunk_size (int): The number of queries sent to a worker at a time.
+    """
+
+    def __init__(self, G, workers=None, chunk_size=64):
+        """
+        Starts the worker processes.
+
+        Args:
+            G (TimeExpandedGraph or str): The time-expanded graph, or the path
+                of a graph file saved by graph.save_graph.
+            workers (int, optional): The number of worker processes, defaults to
+                the number of CPUs.
+            chunk_size (int): The number of queries sent to a worker at a time.
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_worker, initargs=(G,)
+        )
+
+    def map(self, queries):
+        """
+        Answers a batch of path queries in parallel.
+
+        Args:
+            queries (Iterable): The (start, end, kind) queries, kind being the
+                type of path from 1 to 4.
+
+        Returns:
+            list: The result of each query, in input order.
+        """
+        queries = list(queries)
+        chunks = [
+            queries[i : i + self.chunk_size]
+            for i in range(0, len(queries), self.chunk_size)
+        ]
+        results = []
+
+        for chunk in self._executor.map(_run_queries, chunks):
+            results.extend(chunk)
+
+        return results
+
+    def close(self):
+        """Shuts the worker processes down."""
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -1,235 +1,1857 @@
 import numpy as np
 import collections
+import bisect
+import heapq
 
+import instrumentation
+from graph import Landmarks, TimeDependentGraph, TimeExpandedGraph, TimeWindow
 
+
+def _as_lists(vertices, edges):
+    """
+    Returns the vertex and edge lists of a graph.
+
+    Args:
+        vertices (list or TimeExpandedGraph): List of vertices in the graph, or
+            the time-expanded graph itself.
+        edges (list or None): List of edges in the graph, ignored if vertices is
+            a TimeExpandedGraph.
+
+    Returns:
+        tuple: The list of vertices and the list of edges.
+    """
+    if isinstance(vertices, TimeExpandedGraph):
+        return list(vertices.vertices), list(vertices.edges)
+
+    return vertices, edges
+
+
+def _as_graph(vertices, edges):
+    """
+    Returns the time-expanded graph of a graph.
+
+    Args:
+        vertices (list or TimeExpandedGraph): List of vertices in the graph, or
+            the time-expanded graph itself.
+        edges (list or None): List of edges in the graph, ignored if vertices is
+            a TimeExpandedGraph.
+
+    Returns:
+        TimeExpandedGraph: The time-expanded graph.
+    """
+    if isinstance(vertices, TimeExpandedGraph):
+        return vertices
+
+    return TimeExpandedGraph.from_lists(vertices, edges)
+
+
+def _as_window(vertices, edges, window=None):
+    """
+    Returns the time-expanded graph of a graph and the time window of a query.
+
+    Args:
+        vertices (list, TimeExpandedGraph or TimeWindow): List of vertices in
+            the graph, the time-expanded graph itself or a view of it.
+        edges (list or None): List of edges in the graph, ignored if vertices is
+            a TimeExpandedGraph or a TimeWindow.
+        window (tuple, optional): The (t_min, t_max) bounds of the query.
+
+    Returns:
+        tuple: The time-expanded graph and the window of the query, which
+            covers the whole graph if the query is not bounded.
+
+    Raises:
+        ValueError: If the query is bounded by both a TimeWindow and a window,
+            or if a window is given with a TimeDependentGraph.
+    """
+    if isinstance(vertices, TimeWindow):
+        if window is not None:
+            raise ValueError("The query is already bounded by a TimeWindow")
+
+        return vertices.graph, vertices
+
+    if isinstance(vertices, TimeDependentGraph):
+        raise ValueError("Time windows are only supported on a TimeExpandedGraph")
+
+    G = _as_graph(vertices, edges)
+
+    return G, G.window(*(window or ()))
+
+
+def _departure(G, W, start, departure=None):
+    """
+    Returns the time from which an airport can be left in a window.
+
+    Args:
+        G (TimeExpandedGraph): The time-expanded graph.
+        W (TimeWindow): The window of the query.
+        start: The airport.
+        departure (int, optional): The requested time, defaults to the time of
+            the first copy of start in the window.
+
+    Returns:
+        int or None: The time, or None if start has no copy in the window.
+    """
+    if departure is None:
+        return G.first_time(G.airport_ids[start], W.t_min, W.t_max)
+
+    return departure if W.t_min is None else max(departure, W.t_min)
+
+
+def _scan_earliest_arrival(G, source, departure, target=None, window=None):
+    """
+    Connection scan from an airport, in increasing order of departure time.
+
+    Args:
+        G (TimeExpandedGraph): The time-expanded graph.
+        source (int): The starting airport id.
+        departure (int): The time from which the source can be left.
+        target (int, optional): The airport id at which the scan can stop.
+        window (TimeWindow, optional): The window the connections must stay within.
+
+    Returns:
+        tuple: The earliest arrival time at each airport and the index of the
+            connection reaching it, or None.
+    """
+    dep, arr, src, dst = G.connections()
+    arrival = [float("inf")] * len(G.airports)
+    arrival[source] = departure
+    in_connection = [None] * len(G.airports)
+    first = i = bisect.bisect_left(dep, departure)
+    stop, t_max = len(dep), float("inf")
+
+    if window is not None and window.t_max is not None:
+        stop, t_max = window.connection_range()[1], window.t_max
+
+    for i in range(first, stop):
+        t = dep[i]
+
+        # no connection departing later can improve the target
+        if target is not None and t >= arrival[target]:
+            break
+
+        if arrival[src[i]] <= t and arr[i] < arrival[dst[i]] and arr[i] <= t_max:
+            arrival[dst[i]] = arr[i]
+            in_connection[dst[i]] = i
+
+            # the zero duration connections of the same time are in no
+            # particular order, one before i may leave the airport just reached
+            if arr[i] == t:
+                lo, hi = _tie_range(dep, arr, i)
+                changed = True
+
+                while changed:
+                    changed = False
+
+                    for k in range(lo, hi):
+                        if arrival[src[k]] <= t < arrival[dst[k]]:
+                            arrival[dst[k]] = t
+                            in_connection[dst[k]] = k
+                            changed = True
+
+    instrumentation.count("connections", i - first + (i < stop))
+
+    return arrival, in_connection
+
+
+def _tie_range(first, second, i):
+    """
+    Returns the range of the connections with the same times as a connection.
+
+    Args:
+        first (list): The times the connections are sorted by.
+        second (list): The times that break the ties of first.
+        i (int): The index of the connection.
+
+    Returns:
+        tuple: The first index of the range and the index following its last one.
+    """
+    lo = bisect.bisect_left(first, first[i])
+    hi = bisect.bisect_right(first, first[i], lo)
+
+    return (
+        bisect.bisect_left(second, second[i], lo, hi),
+        bisect.bisect_right(second, second[i], lo, hi),
+    )
+
+
+def _scan_latest_departure(G, target, deadline, source=None, window=None):
+    """
+    Connection scan towards an airport, in decreasing order of arrival time.
+
+    Args:
+        G (TimeExpandedGraph): The time-expanded graph.
+        target (int): The destination airport id.
+        deadline (int or float): The time by which the target must be reached.
+        source (int, optional): The airport id at which the scan can stop.
+        window (TimeWindow, optional): The window the connections must stay within.
+
+    Returns:
+        tuple: The latest departure time from each airport and the index of the
+            connection leaving it, or None.
+    """
+    dep, arr, src, dst = G.connections("arrival")
+    latest = [float("-inf")] * len(G.airports)
+    latest[target] = deadline
+    out_connection = [None] * len(G.airports)
+    last = i = bisect.bisect_right(arr, deadline) - 1
+    first, t_min = 0, float("-inf")
+
+    if window is not None and window.t_min is not None:
+        first, t_min = window.connection_range("arrival")[0], window.t_min
+
+    for i in range(last, first - 1, -1):
+        # no connection arriving earlier can leave the source later
+        if source is not None and arr[i] < latest[source]:
+            break
+
+        if arr[i] <= latest[dst[i]] and dep[i] > latest[src[i]] and dep[i] >= t_min:
+            latest[src[i]] = dep[i]
+            out_connection[src[i]] = i
+
+            # as in _scan_earliest_arrival, a zero duration connection scanned
+            # earlier may reach the airport just left
+            if dep[i] == arr[i]:
+                t = dep[i]
+                lo, hi = _tie_range(arr, dep, i)
+                changed = True
+
+                while changed:
+                    changed = False
+
+                    for k in range(lo, hi):
+                        if latest[src[k]] < t <= latest[dst[k]]:
+                            latest[src[k]] = t
+                            out_connection[src[k]] = k
+                            changed = True
+
+    instrumentation.count("connections", last - i + (i >= first))
+
+    return latest, out_connection
+
+
+def _earliest_arrival_path(G, in_connection, source, target):
+    """
+    Rebuilds the path found by an earliest arrival scan.
+
+    Args:
+        G (TimeExpandedGraph): The time-expanded graph.
+        in_connection (list): The connection reaching each airport, as returned
+            by _scan_earliest_arrival.
+        source (int): The starting airport id.
+        target (int): The target airport id.
+
+    Returns:
+        list or None: A list of edges representing the path, or None if no path is found.
+    """
+    if target != source and in_connection[target] is None:
+        return None
+
+    _, _, src, _ = G.connections()
+    connections = []
+    airport = target
+
+    while airport != source:
+        connections.append(in_connection[airport])
+        airport = src[in_connection[airport]]
+    connections.reverse()
+
+    return _journey(G, connections)
+
+
+def _journey(G, connections, order="departure"):
+    """
+    Converts a sequence of connection indices into a path in G.
+
+    Args:
+        G (TimeExpandedGraph): The time-expanded graph.
+        connections (list): Indices of connections, as returned by G.connections().
+        order (str): The order of the connections the indices refer to.
+
+    Returns:
+        list: A list of edges (u, v, t, l) representing the path.
+    """
+    dep, arr, src, dst = G.connections(order)
+
+    return [
+        (G.airports[src[i]], G.airports[dst[i]], dep[i], arr[i] - dep[i])
+        for i in connections
+    ]
+
+
+def _td_earliest_arrival(H, source, departure, target=None, limit=float("inf")):
+    """
+    Earliest arrival search on a time-dependent graph.
+
+    Each airport is settled once, at its earliest arrival time, and the flights
+    it can take are found by binary search on its departure times.
+
+    Args:
+        H (TimeDependentGraph): The time-dependent graph.
+        source (int): The starting airport id.
+        departure (int): The time from which the source can be left.
+        target (int, optional): The airport id at which the search can stop.
+        limit (int or float): Arrivals later than limit are not explored.
+
+    Returns:
+        tuple: The earliest arrival time at each airport and the index of the
+            flight reaching it in H.departures(), or None.
+    """
+    offsets, dep, arr, dst = H.departures()
+    arrival = [float("inf")] * len(H.airports)
+    arrival[source] = departure
+    in_flight = [None] * len(H.airports)
+    settled = [False] * len(H.airports)
+    heap = [(departure, source)]
+    relaxations = 0
+
+    while heap:
+        t, a = heapq.heappop(heap)
+
+        if settled[a]:
+            continue
+
+        settled[a] = True
+
+        if a == target:
+            break
+
+        # a flight leaving after the current arrival at the target cannot improve it
+        bound = limit if target is None else min(limit, arrival[target])
+        lo = bisect.bisect_left(dep, t, offsets[a], offsets[a + 1])
+
+        for k in range(lo, bisect.bisect_right(dep, bound, lo, offsets[a + 1])):
+            v = dst[k]
+
+            if arr[k] < arrival[v] and arr[k] <= limit:
+                arrival[v] = arr[k]
+                in_flight[v] = k
+                heapq.heappush(heap, (arr[k], v))
+                relaxations += 1
+
+    instrumentation.count("settled", sum(settled))
+    instrumentation.count("relaxations", relaxations)
+
+    return arrival, in_flight
+
+
+def _td_flight(H, k):
+    """
+    Returns a flight of a time-dependent graph as a tuple.
+
+    Args:
+        H (TimeDependentGraph): The time-dependent graph.
+        k (int): The index of the flight in H.departures().
+
+    Returns:
+        tuple: The flight (u, v, t, l).
+    """
+    offsets, dep, arr, dst = H.departures()
+    u = bisect.bisect_right(offsets, k) - 1
+
+    return H.airports[u], H.airports[dst[k]], dep[k], arr[k] - dep[k]
+
+
+def _td_earliest_arrival_path(H, in_flight, source, target):
+    """
+    Rebuilds the path found by an earliest arrival search on a time-dependent graph.
+
+    Args:
+        H (TimeDependentGraph): The time-dependent graph.
+        in_flight (list): The flight reaching each airport, as returned by
+            _td_earliest_arrival.
+        source (int): The starting airport id.
+        target (int): The target airport id.
+
+    Returns:
+        list or None: A list of edges representing the path, or None if no path is found.
+    """
+    if target != source and in_flight[target] is None:
+        return None
+
+    path = []
+    airport = target
+
+    while airport != source:
+        flight = _td_flight(H, in_flight[airport])
+        path.append(flight)
+        airport = H.airport_ids[flight[0]]
+    path.reverse()
+
+    return path
+
+
+def _td_earliest_arrival_query(H, start, end, departure):
+    """
+    Answers earliest_arrival on a time-dependent graph.
+
+    Args:
+        H (TimeDependentGraph): The time-dependent graph.
+        start: The starting airport.
+        end: The target airport.
+        departure (int or None): The time from which start can be left,
+            defaults to the first time start appears in a flight.
+
+    Returns:
+        list or None: A list of edges representing the path, or None if no path is found.
+    """
+    source, target = H.airport_ids.get(start), H.airport_ids.get(end)
+
+    if source is None or target is None:
+        return None
+
+    if departure is None:
+        departure = H.first_time(source)
+
+    if source == target:
+        return []
+
+    with instrumentation.phase("search"):
+        _, in_flight = _td_earliest_arrival(H, source, departure, target)
+
+    with instrumentation.phase("path"):
+        return _td_earliest_arrival_path(H, in_flight, source, target)
+
+
+def _td_latest_departure_query(H, start, end, deadline):
+    """
+    Answers latest_departure on a time-dependent graph.
+
+    The search goes backward from the end: each airport is settled once, at
+    the latest time it can be left, and the flights reaching it in time are
+    found by binary search on its arrival times.
+
+    Args:
+        H (TimeDependentGraph): The time-dependent graph.
+        start: The starting airport.
+        end: The target airport.
+        deadline (int or None): The time by which end must be reached,
+            defaults to no deadline.
+
+    Returns:
+        list or None: A list of edges representing the path, or None if no path is found.
+    """
+    source, target = H.airport_ids.get(start), H.airport_ids.get(end)
+
+    if source is None or target is None:
+        return None
+
+    if source == target:
+        return []
+
+    offsets, arr, dep, src = H.arrivals()
+    latest = [float("-inf")] * len(H.airports)
+    latest[target] = float("inf") if deadline is None else deadline
+    out_flight = [None] * len(H.airports)
+    settled = [False] * len(H.airports)
+    heap = [(-latest[target], target)]
+
+    with instrumentation.phase("search"):
+        while heap:
+            t, a = heapq.heappop(heap)
+
+            if settled[a]:
+                continue
+
+            settled[a] = True
+
+            if a == source:
+                break
+
+            # a flight arriving before the current departure from the source cannot improve it
+            hi = bisect.bisect_right(arr, -t, offsets[a], offsets[a + 1])
+            lo = bisect.bisect_right(arr, latest[source], offsets[a], hi)
+
+            for k in range(lo, hi):
+                u = src[k]
+
+                if dep[k] > latest[u]:
+                    latest[u] = dep[k]
+                    out_flight[u] = (k, a)
+                    heapq.heappush(heap, (-dep[k], u))
+
+        instrumentation.count("settled", sum(settled))
+
+    if out_flight[source] is None:
+        return None
+
+    path = []
+    airport = source
+
+    while airport != target:
+        k, next_airport = out_flight[airport]
+        path.append((H.airports[airport], H.airports[next_airport], dep[k], arr[k] - dep[k]))
+        airport = next_airport
+
+    return path
+
+
+def _td_fastest(H, start, end):
+    """
+    Answers type_3 on a time-dependent graph.
+
+    An earliest arrival search is run from every departure time of the start,
+    in increasing order, exploring only the arrivals that would beat the
+    fastest journey found so far.
+
+    Args:
+        H (TimeDependentGraph): The time-dependent graph.
+        start: The starting airport.
+        end: The target airport.
+
+    Returns:
+        list or None: A list of edges representing the path, or None if no path is found.
+    """
+    source, target = H.airport_ids.get(start), H.airport_ids.get(end)
+
+    if source is None or target is None:
+        return None
+
+    if source == target:
+        return []
+
+    offsets, dep, _, _ = H.departures()
+    best, best_in_flight = float("inf"), None
+
+    with instrumentation.phase("search"):
+        for departure in sorted(set(dep[offsets[source] : offsets[source + 1]])):
+            instrumentation.count("candidate_departures")
+            arrival, in_flight = _td_earliest_arrival(
+                H, source, departure, target, departure + best - 1
+            )
+
+            if arrival[target] - departure < best:
+                best, best_in_flight = arrival[target] - departure, in_flight
+
+    if best_in_flight is None:
+        return None
+
+    with instrumentation.phase("path"):
+        return _td_earliest_arrival_path(H, best_in_flight, source, target)
+
+
+def _td_shortest(H, start, end):
+    """
+    Answers type_4 on a time-dependent graph.
+
+    The search settles (airport, time) labels by total flight duration. A label
+    only relaxes the flights of its airport departing before the labels of the
+    airport settled earlier, which left later with a smaller duration, so
+    every flight is relaxed at most once.
+
+    Args:
+        H (TimeDependentGraph or TimeExpandedGraph): The graph, whose
+            departures() and first_time give the flights of each airport.
+        start: The starting airport.
+        end: The target airport.
+
+    Returns:
+        Tuple: Tuple containing the path and the distance.
+    """
+    source, target = H.airport_ids.get(start), H.airport_ids.get(end)
+    departure = None if source is None else H.first_time(source)
+
+    if departure is None or target is None or H.first_time(target) is None:
+        print("No path found")
+
+        return [], float("inf")
+
+    offsets, dep, arr, dst = H.departures()
+    # flights of airport a from position bound[a] on were relaxed already
+    bound = offsets[1:]
+    labels = [(None, None)]
+    heap = [(0, departure, source, 0)]
+    settled = 0
+
+    with instrumentation.phase("search"):
+        while heap:
+            distance, t, a, label = heapq.heappop(heap)
+
+            if a == target:
+                break
+
+            lo = bisect.bisect_left(dep, t, offsets[a], bound[a])
+
+            if lo == bound[a]:
+                continue
+
+            settled += 1
+
+            for k in range(lo, bound[a]):
+                labels.append((k, label))
+                heapq.heappush(
+                    heap, (distance + arr[k] - dep[k], arr[k], dst[k], len(labels) - 1)
+                )
+
+            bound[a] = lo
+        else:
+            distance = None
+
+        instrumentation.count("settled", settled)
+        instrumentation.count("relaxations", len(labels) - 1)
+
+    if distance is None:
+        print("No path found")
+
+        return [], float("inf")
+
+    with instrumentation.phase("path"):
+        path = []
+        k, label = labels[label]
+
+        while k is not None:
+            path.append(_td_flight(H, k))
+            k, label = labels[label]
+        path.reverse()
+
+    return path, distance
+
+
+@instrumentation.instrumented
+def earliest_arrival(vertices, edges, start, end, departure=None, window=None):
+    """Find the path arriving the earliest at an end vertex with a single connection scan.
+
+    Args:
+        vertices (list, TimeExpandedGraph, TimeWindow or TimeDependentGraph):
+            List of vertices in the graph.
+        edges (list or None): List of edges in the graph.
+        start: The starting vertex.
+        end: The target vertex.
+        departure (int, optional): The time from which start can be left,
+            defaults to the time of the first copy of start.
+        window (tuple, optional): The (t_min, t_max) times the path must stay
+            within, either bound may be None.
+
+    Returns:
+        list or None: A list of edges representing the path from the start vertex to the end vertex,
+            or None if no path is found.
+    """
+    if isinstance(vertices, TimeDependentGraph) and window is None:
+        return _td_earliest_arrival_query(vertices, start, end, departure)
+
+    G, W = _as_window(vertices, edges, window)
+
+    with instrumentation.phase("cluster"):
+        source, target = G.airport_ids.get(start), G.airport_ids.get(end)
+
+        if source is None or target is None:
+            return None
+
+        departure = _departure(G, W, start, departure)
+
+        if departure is None:
+            return None
+
+    if source == target:
+        return []
+
+    with instrumentation.phase("search"):
+        _, in_connection = _scan_earliest_arrival(G, source, departure, target, W)
+
+    with instrumentation.phase("path"):
+        return _earliest_arrival_path(G, in_connection, source, target)
+
+
+@instrumentation.instrumented
+def earliest_arrival_all(vertices, edges, start, departure=None, window=None):
+    """Find the earliest arrival paths from a start vertex to every other vertex with a single scan.
+
+    Args:
+        vertices (list, TimeExpandedGraph or TimeWindow): List of vertices in the graph.
+        edges (list or None): List of edges in the graph.
+        start: The starting vertex.
+        departure (int, optional): The time from which start can be left,
+            defaults to the time of the first copy of start.
+        window (tuple, optional): The (t_min, t_max) times the path must stay
+            within, either bound may be None.
+
+    Returns:
+        dict: For each end vertex, the list of edges representing the path,
+            or None if no path is found.
+    """
+    G, W = _as_window(vertices, edges, window)
+    source = G.airport_ids.get(start)
+    departure = None if source is None else _departure(G, W, start, departure)
+
+    if departure is None:
+        return {end: None for end in G.airports}
+
+    with instrumentation.phase("search"):
+        _, in_connection = _scan_earliest_arrival(G, source, departure, window=W)
+
+    with instrumentation.phase("path"):
+        return {
+            end: _earliest_arrival_path(G, in_connection, source, target)
+            for target, end in enumerate(G.airports)
+        }
+
+
+@instrumentation.instrumented
+def latest_departure(vertices, edges, start, end, deadline=None, window=None):
+    """Find the path leaving a start vertex the latest with a single backward connection scan.
+
+    Args:
+        vertices (list, TimeExpandedGraph, TimeWindow or TimeDependentGraph):
+            List of vertices in the graph.
+        edges (list or None): List of edges in the graph.
+        start: The starting vertex.
+        end: The target vertex.
+        deadline (int, optional): The time by which end must be reached,
+            defaults to no deadline.
+        window (tuple, optional): The (t_min, t_max) times the path must stay
+            within, either bound may be None.
+
+    Returns:
+        list or None: A list of edges representing the path from the start vertex to the end vertex,
+            or None if no path is found.
+    """
+    if isinstance(vertices, TimeDependentGraph) and window is None:
+        return _td_latest_departure_query(vertices, start, end, deadline)
+
+    G, W = _as_window(vertices, edges, window)
+    source, target = G.airport_ids.get(start), G.airport_ids.get(end)
+
+    if source is None or target is None:
+        return None
+
+    if deadline is None:
+        deadline = float("inf")
+
+    if W.t_max is not None:
+        deadline = min(deadline, W.t_max)
+
+    if source == target:
+        return []
+
+    with instrumentation.phase("search"):
+        _, out_connection = _scan_latest_departure(G, target, deadline, source, W)
+
+    if out_connection[source] is None:
+        return None
+
+    with instrumentation.phase("path"):
+        _, _, _, dst = G.connections("arrival")
+        connections = []
+        airport = source
+
+        while airport != target:
+            connections.append(out_connection[airport])
+            airport = dst[out_connection[airport]]
+
+        return _journey(G, connections, "arrival")
+
+
+class Profile:
+    """
+    Pareto-optimal (departure, arrival) pairs between two airports.
+
+    A pair is Pareto-optimal when no journey leaves the start later and reaches
+    the end earlier. The profiles of every airport towards the end are kept, so
+    that the journey of any pair can be rebuilt without scanning again.
+
+    Attributes:
+        start: The starting airport.
+        end: The target airport.
+        pairs (list): The (departure, arrival) pairs, sorted by departure time.
+    """
+
+    def __init__(self, G, source, target, departures, arrivals, connections):
+        """
+        Initializes the profile from the result of a profile connection scan.
+
+        Args:
+            G (TimeExpandedGraph): The time-expanded graph.
+            source (int): The starting airport id.
+            target (int): The target airport id.
+            departures (list): For each airport, the negated departure times of its profile.
+            arrivals (list): For each airport, the arrival times of its profile.
+            connections (list): For each airport, the first connection of each journey.
+        """
+        self.start = G.airports[source]
+        self.end = G.airports[target]
+        self.pairs = [
+            (-t1, t2) for t1, t2 in zip(reversed(departures[source]), reversed(arrivals[source]))
+        ]
+        self._G = G
+        self._source = source
+        self._target = target
+        self._departures = departures
+        self._arrivals = arrivals
+        self._connections = connections
+
+    def __len__(self):
+        return len(self.pairs)
+
+    def __iter__(self):
+        return iter(self.pairs)
+
+    def _entry(self, airport, t):
+        """
+        Returns the index of the best profile entry of an airport leaving at t or later.
+
+        Args:
+            airport (int): The airport id.
+            t (int): The time from which the airport can be left.
+
+        Returns:
+            int or None: The index of the entry, or None if the end cannot be reached.
+        """
+        k = bisect.bisect_right(self._departures[airport], -t)
+
+        return k - 1 if k else None
+
+    def earliest_arrival(self, departure):
+        """
+        Returns the earliest arrival at the end when leaving the start at departure or later.
+
+        Args:
+            departure (int): The time from which the start can be left.
+
+        Returns:
+            int or None: The arrival time, or None if the end cannot be reached.
+        """
+        k = self._entry(self._source, departure)
+
+        return None if k is None else self._arrivals[self._source][k]
+
+    def fastest(self):
+        """
+        Returns the pair with the smallest duration, the earliest one in case of a tie.
+
+        Returns:
+            tuple or None: The (departure, arrival) pair, or None if the profile is empty.
+        """
+        return min(self.pairs, key=lambda pair: pair[1] - pair[0], default=None)
+
+    def journey(self, departure):
+        """
+        Rebuilds the path of the best journey leaving the start at departure or later.
+
+        Args:
+            departure (int): The time from which the start can be left.
+
+        Returns:
+            list or None: A list of edges representing the path, or None if the end cannot be reached.
+        """
+        _, arr, _, dst = self._G.connections()
+        connections = []
+        airport, t = self._source, departure
+
+        while airport != self._target:
+            k = self._entry(airport, t)
+
+            if k is None:
+                return None
+
+            i = self._connections[airport][k]
+            connections.append(i)
+            airport, t = dst[i], arr[i]
+
+        return _journey(self._G, connections)
+
+
+def _relax_instant_profiles(G, tie_range, target, departures, arrivals, connections):
+    """
+    Relaxes zero duration connections of the same time until the profiles no
+    longer change, as they are scanned in no particular order.
+
+    Args:
+        G (TimeExpandedGraph): The time-expanded graph.
+        tie_range (tuple): The range of the connections, as returned by _tie_range.
+        target (int): The target airport id.
+        departures (list): For each airport, the negated departure times of its profile.
+        arrivals (list): For each airport, the arrival times of its profile.
+        connections (list): For each airport, the first connection of each journey.
+    """
+    dep, _, src, dst = G.connections()
+    changed = True
+
+    while changed:
+        changed = False
+
+        for i in range(*tie_range):
+            u, v = src[i], dst[i]
+
+            if u == target:
+                continue
+
+            if v == target:
+                t = dep[i]
+            else:
+                k = bisect.bisect_right(departures[v], -dep[i])
+
+                if not k:
+                    continue
+
+                t = arrivals[v][k - 1]
+
+            if not arrivals[u] or t < arrivals[u][-1]:
+                if departures[u] and departures[u][-1] == -dep[i]:
+                    arrivals[u][-1] = t
+                    connections[u][-1] = i
+                else:
+                    departures[u].append(-dep[i])
+                    arrivals[u].append(t)
+                    connections[u].append(i)
+
+                changed = True
+
+
+@instrumentation.instrumented
+def connection_profile(vertices, edges, start, end, window=None):
+    """Compute all Pareto-optimal (departure, arrival) pairs between two vertices with a single scan.
+
+    Args:
+        vertices (list, TimeExpandedGraph or TimeWindow): List of vertices in the graph.
+        edges (list or None): List of edges in the graph.
+        start: The starting vertex.
+        end: The target vertex.
+        window (tuple, optional): The (t_min, t_max) times the path must stay
+            within, either bound may be None.
+
+    Returns:
+        Profile or None: The profile from the start vertex to the end vertex,
+            or None if one of them is not in the graph.
+    """
+    G, W = _as_window(vertices, edges, window)
+    source, target = G.airport_ids.get(start), G.airport_ids.get(end)
+
+    if source is None or target is None:
+        return None
+
+    dep, arr, src, dst = G.connections()
+    stop, t_max = len(dep), float("inf")
+
+    if W.t_max is not None:
+        stop, t_max = W.connection_range()[1], W.t_max
+
+    with instrumentation.phase("cluster"):
+        first_departure = _departure(G, W, start)
+
+        # without a copy of start in the window the profile stays empty
+        if first_departure is None:
+            first_departure = float("inf")
+
+    # profiles are filled by decreasing departure time, with negated times so
+    # that they stay sorted for bisect
+    departures = [[] for _ in G.airports]
+    arrivals = [[] for _ in G.airports]
+    connections = [[] for _ in G.airports]
+
+    i = stop
+
+    with instrumentation.phase("search"):
+        if source != target:
+            for i in range(stop - 1, -1, -1):
+                if dep[i] < first_departure:
+                    break
+
+                u, v = src[i], dst[i]
+
+                if u == target or arr[i] > t_max:
+                    continue
+
+                if v == target:
+                    t = arr[i]
+                else:
+                    k = bisect.bisect_right(departures[v], -arr[i])
+
+                    if not k:
+                        continue
+
+                    t = arrivals[v][k - 1]
+
+                if not arrivals[u] or t < arrivals[u][-1]:
+                    if departures[u] and departures[u][-1] == -dep[i]:
+                        arrivals[u][-1] = t
+                        connections[u][-1] = i
+                    else:
+                        departures[u].append(-dep[i])
+                        arrivals[u].append(t)
+                        connections[u].append(i)
+
+                    # a zero duration connection scanned earlier may reach u
+                    if arr[i] == dep[i]:
+                        _relax_instant_profiles(
+                            G, _tie_range(dep, arr, i), target, departures, arrivals, connections
+                        )
+
+    if instrumentation.active():
+        instrumentation.count("connections", stop - i)
+        instrumentation.count("candidate_pairs", sum(len(pairs) for pairs in arrivals))
+
+    return Profile(G, source, target, departures, arrivals, connections)
+
+
+@instrumentation.instrumented
 def bellman_ford(vertices, edges, start, end):
     """
-    Bellman-Ford algorithm for finding the shortest path in a graph.
+    Bellman-Ford algorithm for finding the shortest path in a graph.
+
+    Args:
+        vertices (list): List of vertices in the graph.
+        edges (list): List of edges in the graph.
+        start: The starting vertex.
+        end: The target vertex.
+
+    Returns:
+        tuple: A tuple containing the distance of the shortest path and the path itself.
+    """
+    vertices, edges = _as_lists(vertices, edges)
+
+    distances = {v: float("inf") for v in vertices}
+    distances[start] = 0
+    parents = collections.defaultdict(lambda: None)
+    relaxations = 0
+
+    with instrumentation.phase("search"):
+        for _ in range(len(vertices) - 1):
+            for edge in edges:
+                if distances[edge.u] + edge.weight < distances[edge.v]:
+                    distances[edge.v] = distances[edge.u] + edge.weight
+                    parents[edge.v] = edge.u
+                    relaxations += 1
+
+    instrumentation.count("rounds", max(len(vertices) - 1, 0))
+    instrumentation.count("relaxations", relaxations)
+    distance = distances[end]
+
+    if end in parents:
+        path = []
+        parent = end
+
+        while parent:
+            path.append(parent)
+            parent = parents[parent]
+        path.reverse()
+
+        return distance, path
+    else:
+        print("No path found")
+
+        return float("inf"), []
+
+
+def _edge_arrays(vertices, edges):
+    """
+    Returns the edges of a graph as integer arrays.
 
     Args:
-        vertices (list): List of vertices in the graph.
-        edges (list): List of edges in the graph.
+        vertices (list, TimeExpandedGraph or TimeWindow): List of vertices in the graph.
+        edges (list or None): List of edges in the graph.
+
+    Returns:
+        tuple: The list of vertices, a mapping from vertex to index, and the arrays
+            of edge sources, edge targets and edge weights.
+    """
+    if isinstance(vertices, TimeExpandedGraph):
+        G = vertices
+
+        return G.vertices, G.vertex_index, G.edge_u, G.edge_v, G.edge_weight
+
+    if isinstance(vertices, TimeWindow):
+        G, lo, hi = vertices.graph, vertices.first_vertex, vertices.last_vertex
+        u, v = G.edge_u, G.edge_v
+        inside = (u >= lo) & (u < hi) & (v >= lo) & (v < hi)
+
+        return G.vertices, G.vertex_index, u[inside], v[inside], G.edge_weight[inside]
+
+    index = {v: i for i, v in enumerate(vertices)}
+    u = np.fromiter((index[edge.u] for edge in edges), dtype=np.int64, count=len(edges))
+    v = np.fromiter((index[edge.v] for edge in edges), dtype=np.int64, count=len(edges))
+    w = np.fromiter((edge.weight for edge in edges), dtype=np.int64, count=len(edges))
+
+    return vertices, index, u, v, w
+
+
+@instrumentation.instrumented
+def bellman_ford_vectorized(vertices, edges, start, end):
+    """
+    Bellman-Ford algorithm relaxing every edge of a round at once with numpy.
+
+    The edges are stored as arrays of sources, targets and weights, and each
+    round scatters the candidate distances to the targets with np.minimum.at.
+    The rounds stop as soon as one of them changes nothing.
+
+    Args:
+        vertices (list, TimeExpandedGraph or TimeWindow): List of vertices in the graph.
+        edges (list or None): List of edges in the graph.
         start: The starting vertex.
         end: The target vertex.
 
     Returns:
         tuple: A tuple containing the distance of the shortest path and the path itself.
     """
-    distances = {v: float("inf") for v in vertices}
-    distances[start] = 0
-    parents = collections.defaultdict(lambda: None)
+    vertices, index, u, v, w = _edge_arrays(vertices, edges)
+    unreachable = np.iinfo(np.int64).max // 2
+    distances = np.full(len(vertices), unreachable, dtype=np.int64)
+    parents = np.full(len(vertices), -1, dtype=np.int64)
 
-    for _ in range(len(vertices) - 1):
-        for edge in edges:
-            if distances[edge.u] + edge.weight < distances[edge.v]:
-                distances[edge.v] = distances[edge.u] + edge.weight
-                parents[edge.v] = edge.u
+    rounds = relaxations = 0
 
-    distance = distances[end]
+    if start in index:
+        distances[index[start]] = 0
 
-    if end in parents:
+        with instrumentation.phase("search"):
+            for _ in range(len(vertices) - 1):
+                rounds += 1
+                candidates = np.where(distances[u] < unreachable, distances[u] + w, unreachable)
+                relaxed = distances.copy()
+                np.minimum.at(relaxed, v, candidates)
+                improved = relaxed < distances
+
+                if not improved.any():
+                    break
+
+                # an edge reaching the new distance of an improved vertex is its parent
+                mask = improved[v] & (candidates == relaxed[v])
+                parents[v[mask]] = u[mask]
+                distances = relaxed
+
+                if instrumentation.active():
+                    relaxations += int(np.count_nonzero(improved))
+
+    instrumentation.count("rounds", rounds)
+    instrumentation.count("relaxations", relaxations)
+
+    if end in index and parents[index[end]] != -1:
         path = []
-        parent = end
+        parent = index[end]
 
-        while parent:
-            path.append(parent)
+        while parent != -1:
+            path.append(vertices[parent])
             parent = parents[parent]
         path.reverse()
 
-        return distance, path
+        return int(distances[index[end]]), path
     else:
         print("No path found")
 
         return float("inf"), []
 
 
-def dijkstra(vertices, edges, start, end):
+def _adjacency(vertices, edges):
+    """
+    Returns an integer-indexed adjacency structure of a graph.
+
+    Args:
+        vertices (list or TimeExpandedGraph): List of vertices in the graph.
+        edges (list or None): List of edges in the graph.
+
+    Returns:
+        tuple: The list of vertices, a mapping from vertex to index, and the CSR
+            lists of offsets, target indices and weights.
+    """
+    if isinstance(vertices, TimeExpandedGraph):
+        G = vertices
+
+        return (G.vertices, G.vertex_index) + G.adjacency()
+
+    index = {v: i for i, v in enumerate(vertices)}
+    offsets = [0] * (len(vertices) + 1)
+
+    for edge in edges:
+        offsets[index[edge.u] + 1] += 1
+
+    for i in range(len(vertices)):
+        offsets[i + 1] += offsets[i]
+
+    position = offsets[:-1]
+    targets = [0] * len(edges)
+    weights = [0] * len(edges)
+
+    for edge in edges:
+        k = position[index[edge.u]]
+        targets[k] = index[edge.v]
+        weights[k] = edge.weight
+        position[index[edge.u]] += 1
+
+    return vertices, index, offsets, targets, weights
+
+
+def _dijkstra_search(offsets, targets, weights, source, goals=None, bounds=None):
+    """
+    Binary heap Dijkstra search over CSR adjacency lists.
+
+    Args:
+        offsets (list): CSR offsets of the out-edges.
+        targets (list): Target index of each edge.
+        weights (list): Weight of each edge.
+        source (int): The index of the starting vertex.
+        goals (set, optional): Indices at which the search can stop once they
+            are all settled, the whole reachable graph is searched otherwise.
+        bounds (tuple, optional): The (lo, hi) range of the indices the search
+            may reach, defaults to every index.
+
+    Returns:
+        tuple: The dict of distances and the dict of predecessors. The
+            distances of the goals are final, other entries may be tentative.
+    """
+    lo, hi = bounds or (0, len(offsets) - 1)
+
+    if not lo <= source < hi:
+        return {}, {}
+
+    distances = {source: 0}
+    predecessors = {source: None}
+    remaining = set(goals) if goals is not None else None
+    heap = [(0, source)]
+    settled = relaxations = 0
+
+    while heap:
+        distance, u = heapq.heappop(heap)
+
+        if distance > distances[u]:
+            continue
+
+        settled += 1
+
+        if remaining is not None:
+            remaining.discard(u)
+
+            if not remaining:
+                break
+
+        for k in range(offsets[u], offsets[u + 1]):
+            v = targets[k]
+            new_distance = distance + weights[k]
+
+            if new_distance < distances.get(v, np.inf) and lo <= v < hi:
+                distances[v] = new_distance
+                predecessors[v] = u
+                heapq.heappush(heap, (new_distance, v))
+                relaxations += 1
+
+    instrumentation.count("settled", settled)
+    instrumentation.count("relaxations", relaxations)
+
+    return distances, predecessors
+
+
+@instrumentation.instrumented
+def dijkstra(vertices, edges, start, end, window=None):
     """Apply Dijkstra's algorithm to find the shortest path between two vertices.
 
+    The search uses a binary heap over adjacency lists and stops as soon as
+    the end vertex is settled.
+
     Args:
-        vertices (list): List of vertices in the graph.
-        edges (list): List of edges in the graph.
+        vertices (list, TimeExpandedGraph or TimeWindow): List of vertices in the graph.
+        edges (list or None): List of edges in the graph.
         start: The starting vertex.
         end: The target vertex.
+        window (tuple, optional): The (t_min, t_max) times the path must stay
+            within, either bound may be None.
 
     Returns:
         tuple: A tuple containing the shortest distance and the path as a list of vertices.
     """
-    nodes = {
-        vertex: {"distance": np.inf, "visited": False, "predecessor": None}
-        for vertex in vertices
-    }
-    nodes[start].update({"distance": 0, "predecessor": None})
-
-    for _ in vertices:
-        selected_node = min(
-            (node for node in nodes if not nodes[node]["visited"]),
-            key=lambda node: nodes[node]["distance"],
-            default=None,
-        )
+    bounds = None
 
-        if selected_node is None:
-            break
+    with instrumentation.phase("cluster"):
+        if window is not None or isinstance(vertices, TimeWindow):
+            G, W = _as_window(vertices, edges, window)
+            vertices, edges, bounds = G, None, (W.first_vertex, W.last_vertex)
 
-        nodes[selected_node]["visited"] = True
+        vertices, index, offsets, targets, weights = _adjacency(vertices, edges)
 
-        # Update distances for unvisited neighbors
-        for edge in edges:
-            if selected_node == edge.u and not nodes[edge.v]["visited"]:
-                neighbor = edge.v
-                new_distance = nodes[edge.u]["distance"] + edge.weight
-                if nodes[neighbor]["distance"] > new_distance:
-                    nodes[neighbor].update(
-                        {"distance": new_distance, "predecessor": edge.u}
-                    )
+    with instrumentation.phase("search"):
+        if start in index and end in index:
+            distances, predecessors = _dijkstra_search(
+                offsets, targets, weights, index[start], {index[end]}, bounds
+            )
+        else:
+            distances, predecessors = {}, {}
 
     # Construct path if it exists
-    if nodes[end]["distance"] != np.inf:
-        path = []
-        current = end
-        while current != start:
-            path.insert(0, current)
-            current = nodes[current]["predecessor"]
-        path.insert(0, start)
+    if index.get(end) in distances:
+        with instrumentation.phase("path"):
+            path = []
+            current = index[end]
+            while current is not None:
+                path.append(vertices[current])
+                current = predecessors[current]
+            path.reverse()
 
-        return nodes[end]["distance"], path
+        return distances[index[end]], path
     else:
         print("No path found")
 
         return float("inf"), []
 
 
-def type_1(vertices, edges, start, end):
-    """Find a path in a graph from a start vertex to an end vertex using the type 1 algorithm.
+@instrumentation.instrumented
+def dijkstra_all(vertices, edges, start, targets=None):
+    """Apply Dijkstra's algorithm to find the distances from a vertex to many vertices at once.
 
     Args:
-        vertices (list): List of vertices in the graph.
-        edges (list): List of edges in the graph.
+        vertices (list or TimeExpandedGraph): List of vertices in the graph.
+        edges (list or None): List of edges in the graph.
         start: The starting vertex.
-        end: The target vertex.
+        targets (list, optional): The target vertices. The search stops once they
+            are all settled, and every reachable vertex is returned if omitted.
 
     Returns:
-        list or None: A list of edges representing the path from the start vertex to the end vertex,
-            or None if no path is found.
+        dict: The shortest distance to each target, inf for unreachable targets.
     """
-    clustered_vertices = collections.defaultdict(list)
-
-    for vertex in vertices:
-        clustered_vertices[vertex[0]].append(vertex)
+    vertices, index, offsets, edge_targets, weights = _adjacency(vertices, edges)
+    goals = None if targets is None else {index[v] for v in targets if v in index}
 
-    source = min(clustered_vertices[start], key=lambda k: k[1])
-    destinations = sorted(clustered_vertices[end], key=lambda k: k[1])
+    if start in index and goals != set():
+        distances, _ = _dijkstra_search(
+            offsets, edge_targets, weights, index[start], goals
+        )
+    else:
+        distances = {}
 
-    for destination in destinations:
-        _, path = bellman_ford(vertices, edges, source, destination)
-        if path != {}:
-            return [
-                (path[vertex][0], path[vertex + 1][0], path[vertex][1], 1)
-                for vertex in range(len(path) - 1)
-                if path[vertex][0] != path[vertex + 1][0]
-            ]
+    if targets is None:
+        return {vertices[i]: distance for i, distance in distances.items()}
 
-    return None
+    return {
+        v: distances.get(index[v], float("inf")) if v in index else float("inf")
+        for v in targets
+    }
 
 
-def type_2(vertices, edges, start, end):
-    """Find a path in a graph from a start vertex to an end vertex using the type 2 algorithm.
+@instrumentation.instrumented
+def type_1(vertices, edges, start, end, window=None):
+    """Find a path in a graph from a start vertex to an end vertex using the type 1 algorithm.
 
     Args:
-        vertices (list): List of vertices in the graph.
-        edges (list): List of edges in the graph.
+        vertices (list, TimeExpandedGraph, TimeWindow or TimeDependentGraph):
+            List of vertices in the graph.
+        edges (list or None): List of edges in the graph.
         start: The starting vertex.
         end: The target vertex.
+        window (tuple, optional): The (t_min, t_max) times the path must stay
+            within, either bound may be None.
 
     Returns:
         list or None: A list of edges representing the path from the start vertex to the end vertex,
             or None if no path is found.
     """
-    clustered_vertices = collections.defaultdict(list)
+    return earliest_arrival(vertices, edges, start, end, window=window)
 
-    for vertex in vertices:
-        clustered_vertices[vertex[0]].append(vertex)
 
-    sources = sorted(clustered_vertices[start], key=lambda k: k[1], reverse=True)
-    destination = max(clustered_vertices[end], key=lambda k: k[1])
+@instrumentation.instrumented
+def type_2(vertices, edges, start, end, window=None):
+    """Find a path in a graph from a start vertex to an end vertex using the type 2 algorithm.
 
-    for source in sources:
-        _, path = bellman_ford(vertices, edges, source, destination)
-        if path:
-            return [
-                (path[i][0], path[i + 1][0], path[i][1], 1)
-                for i in range(len(path) - 1)
-                if path[i][0] != path[i + 1][0]
-            ]
+    Args:
+        vertices (list, TimeExpandedGraph, TimeWindow or TimeDependentGraph):
+            List of vertices in the graph.
+        edges (list or None): List of edges in the graph.
+        start: The starting vertex.
+        end: The target vertex.
+        window (tuple, optional): The (t_min, t_max) times the path must stay
+            within, either bound may be None.
 
-    return None
+    Returns:
+        list or None: A list of edges representing the path from the start vertex to the end vertex,
+            or None if no path is found.
+    """
+    return latest_departure(vertices, edges, start, end, window=window)
 
 
-def type_3(vertices, edges, start, end):
+@instrumentation.instrumented
+def type_3(vertices, edges, start, end, window=None):
     """Find a path in a graph from a start vertex to an end vertex using the type 3 algorithm.
 
     Args:
-        vertices (List[Tuple]): List of vertices.
-        edges (List[Tuple]): List of edges.
+        vertices (List[Tuple], TimeExpandedGraph, TimeWindow or TimeDependentGraph):
+            List of vertices.
+        edges (List[Tuple] or None): List of edges.
         start (Any): Start vertex.
         end (Any): End vertex.
+        window (Tuple, optional): The (t_min, t_max) times the path must stay
+            within, either bound may be None.
 
     Returns:
-        List[Tuple]: List of tuples representing the path.
+        List[Tuple] or None: List of tuples representing the path, or None if no path is found.
     """
-    clustered_vertices = collections.defaultdict(list)
+    if isinstance(vertices, TimeDependentGraph) and window is None:
+        return _td_fastest(vertices, start, end)
 
-    for vertex in vertices:
-        clustered_vertices[vertex[0]].append(vertex)
+    profile = connection_profile(vertices, edges, start, end, window)
 
-    sources = clustered_vertices[start]
-    destinations = clustered_vertices[end]
-    dictemps = collections.defaultdict(list)
+    if profile is None:
+        return None
 
-    for source in sources:
-        for destination in destinations:
-            _, t1 = source
-            _, t2 = destination
+    if start == end:
+        return []
 
-            if t2 > t1:
-                dictemps[t2 - t1].append((source, destination))
+    fastest = profile.fastest()
 
-    tri = sorted(dictemps.items(), key=lambda k: k[0])
+    if fastest is None:
+        return None
 
-    for _, possible_paths in tri:
-        for source, destination in possible_paths:
-            _, path = bellman_ford(vertices, edges, source, destination)
-            if path:
-                return [
-                    (u[0], v[0], u[1], 1)
-                    for u, v in zip(path, path[1:])
-                    if u[0] != v[0]
-                ]
+    return profile.journey(fastest[0])
 
-    return None
 
+def _dag_search(G, source, target=None, end=None):
+    """
+    Shortest distances from a vertex, relaxing the edges in topological order.
+
+    The vertex ids of a time-expanded graph without backward edges are a
+    topological order, so each edge is relaxed once, in O(V + E). Only the
+    vertex ids from source to end are searched, and the lists are allocated
+    for them alone.
+
+    Args:
+        G (TimeExpandedGraph): The time-expanded graph, G.is_dag() must hold.
+        source (int): The starting vertex id.
+        target (int, optional): The vertex id after which the search can stop.
+        end (int, optional): The vertex id following the last one the search
+            may reach, defaults to the number of vertices.
+
+    Returns:
+        tuple: The list of distances and the list of predecessors, indexed by
+            vertex id minus source.
+    """
+    offsets, targets, weights = G.adjacency()
+    end = G.num_vertices if end is None else end
+    distances = [float("inf")] * (end - source)
+    predecessors = [None] * (end - source)
+    distances[0] = 0
+    stop = end if target is None else target
+    settled = relaxations = 0
+
+    for u in range(source, stop):
+        distance = distances[u - source]
+
+        if distance == float("inf"):
+            continue
+
+        settled += 1
+
+        for k in range(offsets[u], offsets[u + 1]):
+            v = targets[k]
+
+            if v < end and distance + weights[k] < distances[v - source]:
+                distances[v - source] = distance + weights[k]
+                predecessors[v - source] = u
+                relaxations += 1
+
+    instrumentation.count("settled", settled)
+    instrumentation.count("relaxations", relaxations)
+
+    return distances, predecessors
+
+
+@instrumentation.instrumented
+def dag_shortest_path(vertices, edges, start, end, window=None):
+    """Find the shortest path between two vertices of an acyclic time-expanded graph in linear time.
+
+    Falls back to Dijkstra when a zero duration flight breaks the topological
+    order of the vertex ids, and to Bellman-Ford when a flight has a negative
+    duration.
+
+    Args:
+        vertices (list, TimeExpandedGraph or TimeWindow): List of vertices in the graph.
+        edges (list or None): List of edges in the graph.
+        start: The starting vertex.
+        end: The target vertex.
+        window (tuple, optional): The (t_min, t_max) times the path must stay
+            within, either bound may be None.
+
+    Returns:
+        tuple: A tuple containing the distance of the shortest path and the path itself.
+    """
+    G, W = _as_window(vertices, edges, window)
+
+    if not G.is_dag():
+        if G.out_weights.min() >= 0:
+            return dijkstra(W, None, start, end)
 
-def type_4(e, a, s, d):
+        return bellman_ford_vectorized(W, None, start, end)
+
+    with instrumentation.phase("cluster"):
+        source, target = G.vertex_id(*start), G.vertex_id(*end)
+
+    with instrumentation.phase("search"):
+        if (
+            source is not None
+            and target is not None
+            and source in W
+            and target in W
+            and source <= target
+        ):
+            distances, predecessors = _dag_search(G, source, target, W.last_vertex)
+        else:
+            distances, predecessors = {}, {}
+
+    if distances and distances[target - source] != float("inf"):
+        with instrumentation.phase("path"):
+            path = []
+            current = target
+            while current is not None:
+                path.append(G.vertex(current))
+                current = predecessors[current - source]
+            path.reverse()
+
+        return distances[target - source], path
+    else:
+        print("No path found")
+
+        return float("inf"), []
+
+
+@instrumentation.instrumented
+def type_4(e, a, s, d, window=None):
     """Find a path in a graph from a start vertex to an end vertex using the type 4 algorithm.
 
+    The path goes from the first copy of the start vertex to the last copy of
+    the end vertex, which the waiting edges connect to every other copy.
+
     Args:
-        e (List[Tuple]): List of vertices.
+        e (List[Tuple], TimeExpandedGraph, TimeWindow or TimeDependentGraph):
+            List of vertices.
         a (Any): Placeholder argument.
         s (Any): Start vertex.
         d (Any): End vertex.
+        window (Tuple, optional): The (t_min, t_max) times the path must stay
+            within, either bound may be None. The path then goes from the first
+            copy of the start vertex to the last copy of the end vertex in the window.
 
     Returns:
         Tuple: Tuple containing the distance and path.
     """
-    clustered_vertices = {i[0]: i for i in e}
+    if isinstance(e, TimeDependentGraph) and window is None:
+        return _td_shortest(e, s, d)
+
+    # the flight indexes of a graph with pending updates are up to date, its
+    # vertex arrays would have to be rebuilt
+    if (
+        isinstance(e, TimeExpandedGraph)
+        and e.pending_updates
+        and window is None
+        and e.min_weight() >= 0
+    ):
+        return _td_shortest(e, s, d)
+
+    G, W = _as_window(e, a, window)
+
+    with instrumentation.phase("cluster"):
+        source, sink = W.first_copy(s), W.last_copy(d)
+
+    if source is None or sink is None:
+        print("No path found")
+
+        return [], float("inf")
+
+    dis, path = dag_shortest_path(W, None, G.vertex(source), G.vertex(sink))
+
+    return _path_in_G(path), dis
+
+
+def _path_in_G(path):
+    """
+    Converts a path of vertices of G tilde into the flights it takes in G.
 
-    dis, path = bellman_ford(e, a, clustered_vertices[s], clustered_vertices[d])
+    Args:
+        path (list): The path as a list of (airport, t) vertices.
 
+    Returns:
+        list: A list of edges (u, v, t, l) representing the path.
+    """
     path_in_G = []
 
     for vertex in range(len(path) - 1):
         if path[vertex][0] != path[vertex + 1][0]:
-            edge = (path[vertex][0], path[vertex + 1][0], path[vertex][1], 1)
+            edge = (
+                path[vertex][0],
+                path[vertex + 1][0],
+                path[vertex][1],
+                path[vertex + 1][1] - path[vertex][1],
+            )
             path_in_G.append(edge)
 
-    return path_in_G, dis
+    return path_in_G
+
+
+def _type_4_search(G, source):
+    """
+    Shortest distances from a vertex with the fastest algorithm the graph allows.
+
+    Args:
+        G (TimeExpandedGraph): The time-expanded graph.
+        source (int): The starting vertex id.
+
+    Returns:
+        tuple or None: The distances and predecessors, indexable by vertex id,
+            or None if the graph has negative weights.
+    """
+    if G.is_dag():
+        distances, predecessors = _dag_search(G, source)
+
+        return [float("inf")] * source + distances, [None] * source + predecessors
+
+    if G.out_weights.min() >= 0:
+        distances, predecessors = _dijkstra_search(*G.adjacency(), source)
+
+        return collections.defaultdict(lambda: float("inf"), distances), predecessors
+
+    return None
+
+
+@instrumentation.instrumented
+def type_4_all(vertices, edges, start):
+    """Find the type 4 paths from a start vertex to every other vertex with a single search.
+
+    Args:
+        vertices (List[Tuple] or TimeExpandedGraph): List of vertices.
+        edges (List[Tuple] or None): List of edges.
+        start (Any): Start vertex.
+
+    Returns:
+        dict: For each end vertex, the tuple containing the path and the distance,
+            ([], inf) if there is no path.
+    """
+    G = _as_graph(vertices, edges)
+    source = G.first_copy(start)
+
+    if source is None:
+        return {end: ([], float("inf")) for end in G.airports}
+
+    search = _type_4_search(G, source)
+
+    if search is None:
+        return {end: type_4(G, None, start, end) for end in G.airports}
+
+    distances, predecessors = search
+    paths = {}
+
+    for end in G.airports:
+        current = G.last_copy(end)
+
+        if current is None or distances[current] == float("inf"):
+            paths[end] = ([], float("inf"))
+            continue
+
+        dis = distances[current]
+        path = []
+        while current is not None:
+            path.append(G.vertex(current))
+            current = predecessors[current]
+        path.reverse()
+        paths[end] = (_path_in_G(path), dis)
+
+    return paths
+
+
+@instrumentation.instrumented
+def type_4_matrix(vertices, edges):
+    """Compute the type 4 distances between every pair of vertices.
+
+    Args:
+        vertices (List[Tuple] or TimeExpandedGraph): List of vertices.
+        edges (List[Tuple] or None): List of edges.
+
+    Returns:
+        np.ndarray: The matrix of distances, indexed by airport id in both
+            dimensions, inf where there is no path.
+    """
+    G = _as_graph(vertices, edges)
+    nb_airports = len(G.airports)
+    matrix = np.full((nb_airports, nb_airports), np.inf)
+
+    # the last copy of an airport collects every arrival through the waiting edges
+    has_copies = np.diff(G.airport_offsets) > 0
+    firsts = G.airport_vertices[G.airport_offsets[:-1][has_copies]]
+    lasts = G.airport_vertices[G.airport_offsets[1:][has_copies] - 1]
+    columns = np.flatnonzero(has_copies)
+
+    for row, source in zip(columns.tolist(), firsts.tolist()):
+        search = _type_4_search(G, source)
+
+        if search is None:
+            paths = type_4_all(G, None, G.airports[row])
+            matrix[row] = [paths[end][1] for end in G.airports]
+            continue
+
+        distances, _ = search
+        matrix[row, columns] = [distances[v] for v in lasts.tolist()]
+
+    return matrix
+
+
+def _airport_distances(G, airport, reverse=False):
+    """
+    Shortest flight durations from an airport on the airport level graph,
+    whatever the departure times.
+
+    Args:
+        G (TimeExpandedGraph): The time-expanded graph.
+        airport (int): The airport id.
+        reverse (bool): Whether to compute the durations to the airport instead.
+
+    Returns:
+        np.ndarray: The duration from (or to) each airport, inf if unreachable.
+    """
+    distances, _ = _dijkstra_search(*G.routes(reverse), airport)
+    result = np.full(len(G.airports), np.inf)
+    result[list(distances)] = list(distances.values())
+
+    return result
+
+
+@instrumentation.instrumented
+def build_landmarks(vertices, edges, nb_landmarks=8):
+    """Compute the landmark tables of a graph, for type_4_astar.
+
+    The first landmark is the airport with the most routes, and every next one
+    is the airport farthest from the landmarks already chosen.
+
+    Args:
+        vertices (List[Tuple] or TimeExpandedGraph): List of vertices.
+        edges (List[Tuple] or None): List of edges.
+        nb_landmarks (int): The number of landmarks.
+
+    Returns:
+        Landmarks: The tables, for the current version of the graph. Assign them
+            to G.landmarks so that type_4_astar uses them and save_graph saves them.
+    """
+    G = _as_graph(vertices, edges)
+    nb_landmarks = min(nb_landmarks, len(G.airports))
+    offsets = np.asarray(G.routes()[0])
+    airports, to_landmark, from_landmark = [], [], []
+    candidate = int(np.argmax(np.diff(offsets))) if nb_landmarks else None
+
+    for _ in range(nb_landmarks):
+        airports.append(candidate)
+        to_landmark.append(_airport_distances(G, candidate, reverse=True))
+        from_landmark.append(_airport_distances(G, candidate))
+
+        # the round trip to the nearest landmark, over the airports it connects to
+        round_trip = np.min(np.array(to_landmark) + np.array(from_landmark), axis=0)
+        round_trip[~np.isfinite(round_trip)] = -1
+        round_trip[airports] = -1
+        candidate = int(np.argmax(round_trip))
+
+    shape = (nb_landmarks, len(G.airports))
+
+    return Landmarks(
+        np.array(airports, dtype=np.int64),
+        np.array(to_landmark).reshape(shape),
+        np.array(from_landmark).reshape(shape),
+        G.version,
+    )
+
+
+@instrumentation.instrumented
+def type_4_astar(e, a, s, d, landmarks=None):
+    """Find a type 4 path with an A* search directed towards the end vertex.
+
+    The search settles the vertices of G tilde by their distance plus a lower
+    bound on the remaining flight durations, the duration of the fastest
+    route from their airport to the end vertex whatever the departure times.
+    The bounds come from landmark tables if there are some, and from a
+    Dijkstra search on the airport level graph otherwise. Copies later than
+    the last copy of the end vertex are never settled. The distance is the
+    one of type_4, the "settled" counter of the instrumentation gives the
+    number of vertices the search expanded.
+
+    Args:
+        e (List[Tuple] or TimeExpandedGraph): List of vertices.
+        a (Any): Placeholder argument.
+        s (Any): Start vertex.
+        d (Any): End vertex.
+        landmarks (Landmarks, optional): The landmark tables, defaults to
+            G.landmarks if they are up to date.
+
+    Returns:
+        Tuple: Tuple containing the path and the distance.
+
+    Raises:
+        ValueError: If the landmark tables were computed for another version of
+            the graph, before flights were added or removed, since their bounds
+            may then overestimate the remaining durations.
+    """
+    G = _as_graph(e, a)
+
+    if landmarks is not None and (
+        landmarks.version != G.version or landmarks.to_landmark.shape[1] != len(G.airports)
+    ):
+        raise ValueError(
+            f"The landmarks were computed for version {landmarks.version} of the graph, "
+            f"which is at version {G.version}, rebuild them with build_landmarks"
+        )
+
+    if len(G.out_weights) and G.out_weights.min() < 0:
+        return type_4(G, None, s, d)
+
+    with instrumentation.phase("cluster"):
+        source, sink = G.first_copy(s), G.last_copy(d)
+
+    if source is None or sink is None:
+        print("No path found")
+
+        return [], float("inf")
+
+    with instrumentation.phase("bounds"):
+        target = G.airport_ids[d]
+
+        if landmarks is None and G.landmarks is not None and G.landmarks.version == G.version:
+            landmarks = G.landmarks
+
+        if landmarks is None:
+            bounds = _airport_distances(G, target, reverse=True).tolist()
+        else:
+            bounds = landmarks.bounds(target).tolist()
+
+    offsets, targets, weights = G.adjacency()
+    vertex_airports = G.vertex_airports()
+    # vertex ids are sorted by time, copies after the sink cannot reach it
+    end = int(np.searchsorted(G.vertex_time, G.vertex_time[sink], side="right"))
+    distances = {source: 0}
+    predecessors = {source: None}
+    # among vertices of equal estimate, the one with the largest distance is
+    # the closest to the end vertex
+    heap = [(bounds[vertex_airports[source]], 0, source)]
+    settled = relaxations = 0
+
+    with instrumentation.phase("search"):
+        while heap:
+            _, distance, u = heapq.heappop(heap)
+            distance = -distance
+
+            if distance > distances[u]:
+                continue
+
+            settled += 1
+
+            if u == sink:
+                break
+
+            for k in range(offsets[u], offsets[u + 1]):
+                v = targets[k]
+                new_distance = distance + weights[k]
+
+                if v < end and new_distance < distances.get(v, float("inf")):
+                    bound = bounds[vertex_airports[v]]
+
+                    if bound == float("inf"):
+                        continue
+
+                    distances[v] = new_distance
+                    predecessors[v] = u
+                    heapq.heappush(heap, (new_distance + bound, -new_distance, v))
+                    relaxations += 1
+
+        instrumentation.count("settled", settled)
+        instrumentation.count("relaxations", relaxations)
+
+    if sink not in distances:
+        print("No path found")
+
+        return [], float("inf")
+
+    with instrumentation.phase("path"):
+        path = []
+        current = sink
+        while current is not None:
+            path.append(G.vertex(current))
+            current = predecessors[current]
+        path.reverse()
+
+    return _path_in_G(path), distances[sink]
@@ -1,97 +1,593 @@
-import matplotlib.pyplot as plt
-import numpy as np
+import argparse
+import contextlib
+import csv
+import functools
+import io
+import json
+import random
+import statistics
+import sys
 import time
+import tracemalloc
+
+import numpy as np
 
 import pathfinding
 import graph
+import lp_backends
+
+
+def make_workload(
+    nb_vertices, nb_edges, nb_queries, seed, topology=None, horizon=None, durations=None
+):
+    """
+    Generates a reproducible graph and a list of queries on it.
+
+    Args:
+        nb_vertices (int): The number of vertices of the generated graph.
+        nb_edges (int): The number of edges of the generated graph.
+        nb_queries (int): The number of (start, end) queries.
+        seed (int): The seed of the random generators.
+        topology (str, optional): The topology of graph.generate_network, the
+            graph is generated by graph.generate_graph_G if omitted.
+        horizon (int, optional): The horizon of graph.generate_network,
+            defaults to its own.
+        durations (tuple, optional): The smallest and largest flight durations
+            of graph.generate_network, defaults to its own.
+
+    Raises:
+        ValueError: If a horizon or durations are given without a topology,
+            graph.generate_graph_G having neither.
+
+    Returns:
+        tuple: The flights, their time-expanded graph and the queries.
+    """
+    options = {
+        name: value
+        for name, value in (("horizon", horizon), ("durations", durations))
+        if value is not None
+    }
+
+    if topology is None:
+        if options:
+            raise ValueError("The legacy generator has no horizon nor durations options")
+
+        random.seed(seed)
+        P = graph.generate_graph_G(nb_vertices, nb_edges)
+    else:
+        P = graph.generate_network(
+            nb_vertices, nb_edges, topology, seed=seed, as_tuples=True, **options
+        )
+
+    G = graph.build_time_expanded_graph(P)
+    rng = random.Random(seed)
+    queries = [
+        (f"s{rng.randrange(nb_vertices)}", f"s{rng.randrange(nb_vertices)}")
+        for _ in range(nb_queries)
+    ]
+
+    return P, G, queries
+
+
+@functools.lru_cache(maxsize=1)
+def _time_dependent_graph(G):
+    """
+    Builds the time-dependent graph of the flights of G, once per workload.
+
+    Args:
+        G (TimeExpandedGraph): The time-expanded graph of the workload.
+
+    Returns:
+        TimeDependentGraph: The time-dependent graph of the same flights.
+    """
+    src, dst, dep, arr = G.flights()
+
+    return graph.TimeDependentGraph.from_arrays(
+        G.airports,
+        src.astype(np.int64),
+        dst.astype(np.int64),
+        dep.astype(np.int64),
+        (arr - dep).astype(np.int64),
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def _landmarks(G):
+    """
+    Computes the landmark tables of G, once per workload.
+
+    Args:
+        G (TimeExpandedGraph): The time-expanded graph of the workload.
+
+    Returns:
+        Landmarks: The tables of pathfinding.build_landmarks.
+    """
+    return pathfinding.build_landmarks(G, None)
+
+
+@functools.lru_cache(maxsize=2)
+def _lp_session(G, name):
+    """
+    Creates the session of an LP backend on G, once per workload.
 
+    Args:
+        G (TimeExpandedGraph): The time-expanded graph of the workload.
+        name (str): The name of the LP backend.
 
-def measure_execution_time(range_values, nb_iter, graph_params_func, pathfinding_func):
+    Returns:
+        LPSession: The session.
     """
-    Measure the execution time of a pathfinding algorithm for different graph parameters.
+    return lp_backends.get_backend(name).session(G)
+
+
+def _run_queries(func, G, queries):
+    for s, d in queries:
+        func(G, None, s, d)
+
+
+def _run_dijkstra(G, queries):
+    for s, d in queries:
+        source, sink = G.first_copy(s), G.last_copy(d)
+
+        if source is not None and sink is not None:
+            pathfinding.dijkstra(G, None, G.vertex(source), G.vertex(sink))
+
+
+def _run_lp(name, G, queries):
+    backend = lp_backends.get_backend(name)
+
+    for s, d in queries:
+        backend.solve(G, None, s, d)
+
+
+def _run_lp_session(name, G, queries):
+    session = _lp_session(G, name)
+
+    for s, d in queries:
+        session.solve(s, d)
+
+
+def _run_gurobi(G, queries):
+    import gurobi_solver
+
+    for s, d in queries:
+        gurobi_solver.gurobi(G, None, s, d)
+
+
+BENCHMARKS = {
+    "build": lambda P, G, queries: graph.build_time_expanded_graph(P),
+    "buildGraph": lambda P, G, queries: graph.buildGraph(P),
+    "type_1": lambda P, G, queries: _run_queries(pathfinding.type_1, G, queries),
+    "type_2": lambda P, G, queries: _run_queries(pathfinding.type_2, G, queries),
+    "type_3": lambda P, G, queries: _run_queries(pathfinding.type_3, G, queries),
+    "type_4": lambda P, G, queries: _run_queries(pathfinding.type_4, G, queries),
+    "type_4_astar": lambda P, G, queries: _run_queries(
+        pathfinding.type_4_astar, G, queries
+    ),
+    "build_landmarks": lambda P, G, queries: pathfinding.build_landmarks(G, None),
+    "type_4_astar_landmarks": lambda P, G, queries: _run_queries(
+        functools.partial(pathfinding.type_4_astar, landmarks=_landmarks(G)), G, queries
+    ),
+    "dijkstra": lambda P, G, queries: _run_dijkstra(G, queries),
+    "build_time_dependent": lambda P, G, queries: graph.build_time_dependent_graph(P),
+    "time_dependent_type_1": lambda P, G, queries: _run_queries(
+        pathfinding.type_1, _time_dependent_graph(G), queries
+    ),
+    "time_dependent_type_2": lambda P, G, queries: _run_queries(
+        pathfinding.type_2, _time_dependent_graph(G), queries
+    ),
+    "time_dependent_type_3": lambda P, G, queries: _run_queries(
+        pathfinding.type_3, _time_dependent_graph(G), queries
+    ),
+    "time_dependent_type_4": lambda P, G, queries: _run_queries(
+        pathfinding.type_4, _time_dependent_graph(G), queries
+    ),
+    "highs": lambda P, G, queries: _run_lp("highs", G, queries),
+    "highs_session": lambda P, G, queries: _run_lp_session("highs", G, queries),
+    "gurobi": lambda P, G, queries: _run_gurobi(G, queries),
+    "gurobi_session": lambda P, G, queries: _run_lp_session("gurobi", G, queries),
+}
+
+
+# the benchmarks building a structure, whose memory is recorded with the timings
+MEMORY_BENCHMARKS = ("build", "buildGraph", "build_time_dependent", "build_landmarks")
+
+
+def available_benchmarks():
+    """
+    Lists the benchmarks that can run in the current environment.
+
+    Returns:
+        list: The names of the available benchmarks.
+    """
+    names = list(BENCHMARKS)
+
+    try:
+        import gurobipy  # noqa: F401
+    except ImportError:
+        print("gurobipy is not installed, skipping the gurobi benchmarks")
+        names = [name for name in names if not name.startswith("gurobi")]
+
+    return names
+
+
+def measure(func, repeat, warmup):
+    """
+    Measures the execution time of a function with time.perf_counter.
+
+    The function is called warmup times first, so that the caches of the graph,
+    the time-dependent graph of the time_dependent benchmarks, the landmarks of
+    type_4_astar_landmarks and the LP sessions are built and the timings only
+    measure the steady state. Its prints, such
+    as "No path found", are discarded.
 
     Args:
-            range_values (Iterable): The range of values for the graph parameters.
-            nb_iter (int): The number of iterations to perform for each graph parameter.
-            graph_params_func (Callable): A function that generates graph parameters based on a given value.
-            pathfinding_func (Callable): The pathfinding algorithm to measure the execution time of.
+        func (Callable): The function to measure, called without arguments.
+        repeat (int): The number of timed calls.
+        warmup (int): The number of untimed calls before them.
 
     Returns:
-            dict: A dictionary containing the minimum, mean, and maximum execution times for each graph parameter.
+        dict: The minimum, median, mean and maximum execution times in seconds.
     """
-    times = {"minimums": [], "means": [], "maximums": []}
+    times = []
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(warmup):
+            func()
 
-    for value in range_values:
-        print(f"value: {value}")
-        values = [
-            time_execution(graph_params_func, value, pathfinding_func, value)
-            for _ in range(nb_iter)
-        ]
-        times["minimums"].append(np.min(values))
-        times["means"].append(np.mean(values))
-        times["maximums"].append(np.max(values))
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - t0)
 
-    return times
+    return {
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.mean(times),
+        "max": max(times),
+    }
 
 
-def time_execution(graph_params_func, value, pathfinding_func, num_vertices):
+def measure_memory(func):
     """
-    Measure the execution time of a pathfinding algorithm for a given graph.
+    Measures the memory allocated by a function and kept alive by its result.
 
     Args:
-            graph_params_func (Callable): A function that generates graph parameters based on a given value.
-            value: The value used to generate the graph parameters.
-            pathfinding_func (Callable): The pathfinding algorithm to measure the execution time of.
+        func (Callable): The function building the structure, called without
+            arguments.
 
     Returns:
-            float: The execution time of the pathfinding algorithm.
+        int: The number of bytes still allocated once the function returns.
     """
-    P = graph_params_func(value)
-    V, E = graph.buildGraph(P)
+    tracemalloc.start()
 
-    t0 = time.time()
-    _, _ = pathfinding_func(V, E, num_vertices)
-    t1 = time.time() - t0
+    try:
+        result = func()  # noqa: F841, keeps the structure alive until it is measured
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
 
-    return t1
+    return size
 
 
-def plot_results(range_values, times, xlabel):
+def run_suite(
+    sizes,
+    names,
+    nb_queries=20,
+    repeat=5,
+    warmup=1,
+    seed=0,
+    topology=None,
+    horizon=None,
+    durations=None,
+):
     """
-    Plots the results of a performance analysis.
+    Runs the benchmarks on graphs of several sizes.
 
     Args:
-        range_values (list): The range of values for the x-axis.
-        times (dict): A dictionary containing the mean, minimum, and maximum times.
+        sizes (list): The (nb_vertices, nb_edges) sizes of the graphs.
+        names (list): The names of the benchmarks to run.
+        nb_queries (int): The number of queries of the query benchmarks.
+        repeat (int): The number of timed runs of each benchmark.
+        warmup (int): The number of untimed runs before them.
+        seed (int): The seed of the generated graphs and queries.
+        topology (str, optional): The topology of the generated graphs, see
+            make_workload.
+        horizon (int, optional): The horizon of the generated graphs, see
+            make_workload.
+        durations (tuple, optional): The flight durations of the generated
+            graphs, see make_workload.
+
+    Returns:
+        list: One record per benchmark and size, with the timings in seconds
+            and, for the benchmarks of MEMORY_BENCHMARKS, the bytes kept alive
+            by the structure built.
+    """
+    records = []
+
+    for nb_vertices, nb_edges in sizes:
+        P, G, queries = make_workload(
+            nb_vertices, nb_edges, nb_queries, seed, topology, horizon, durations
+        )
+
+        for name in names:
+            timings = measure(lambda: BENCHMARKS[name](P, G, queries), repeat, warmup)
+            nbytes = (
+                measure_memory(lambda: BENCHMARKS[name](P, G, queries))
+                if name in MEMORY_BENCHMARKS
+                else None
+            )
+            records.append(
+                {
+                    "benchmark": name,
+                    "nb_vertices": nb_vertices,
+                    "nb_edges": nb_edges,
+                    "nb_queries": nb_queries,
+                    "repeat": repeat,
+                    "seed": seed,
+                    "topology": topology or "legacy",
+                    "horizon": horizon,
+                    "durations": None if durations is None else list(durations),
+                    **timings,
+                    "bytes": nbytes,
+                }
+            )
+            print(
+                f"{name}, {nb_vertices} vertices, {nb_edges} edges: "
+                f"{timings['median'] * 1000:.2f} ms (median)"
+                + ("" if nbytes is None else f", {nbytes / nb_edges:.0f} bytes per edge")
+            )
+
+    return records
+
+
+def write_json(records, path):
+    """
+    Writes benchmark records to a JSON file, usable as a baseline.
+
+    Args:
+        records (list): The benchmark records.
+        path (str): The path of the file.
+    """
+    with open(path, "w") as f:
+        json.dump(records, f, indent=2)
+
+
+def write_csv(records, path):
+    """
+    Writes benchmark records to a CSV file.
+
+    Args:
+        records (list): The benchmark records.
+        path (str): The path of the file.
+    """
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(records[0]))
+        writer.writeheader()
+        writer.writerows(records)
+
+
+def compare_to_baseline(records, baseline, threshold):
+    """
+    Finds the benchmarks whose median time or memory regressed compared to a
+    baseline.
+
+    A record is compared with the baseline record of the same benchmark, size,
+    topology, horizon and durations.
+
+    Args:
+        records (list): The benchmark records.
+        baseline (list): The records of the baseline run.
+        threshold (float): The tolerated growth, 0.2 for 20 %.
+
+    Returns:
+        list: The (benchmark, nb_vertices, nb_edges, metric, baseline value,
+            value) tuples of the regressions, the metric being "median" or
+            "bytes".
+    """
+    def key(record):
+        return record["benchmark"], record["nb_vertices"], record["nb_edges"]
+
+    def schedule(record):
+        durations = record.get("durations")
+
+        return record.get("horizon"), None if durations is None else tuple(durations)
+
+    def topology(record):
+        return record.get("topology", "legacy")
+
+    topologies = {topology(record) for record in records}
+    baseline = [record for record in baseline if topology(record) in topologies]
+
+    reference = {(key(record), schedule(record)): record for record in baseline}
+    regressions = []
+
+    for record in records:
+        for metric in ("median", "bytes"):
+            before = reference.get((key(record), schedule(record)), {}).get(metric)
+            after = record.get(metric)
+
+            if before is not None and after is not None and after > before * (1 + threshold):
+                regressions.append((*key(record), metric, before, after))
+
+    return regressions
+
+
+def plot_results(records, name, xlabel="Number of edges"):
+    """
+    Plots the timings of a benchmark against the number of edges.
+
+    Args:
+        records (list): The benchmark records.
+        name (str): The name of the benchmark to plot.
         xlabel (str): The label for the x-axis.
     """
-    plt.plot(range_values, times["means"], color="deepskyblue")
+    import matplotlib.pyplot as plt
+
+    records = [record for record in records if record["benchmark"] == name]
+    range_values = [record["nb_edges"] for record in records]
+    plt.plot(
+        range_values, [record["median"] for record in records], color="deepskyblue"
+    )
     plt.fill_between(
-        range_values, times["minimums"], times["maximums"], color="lightskyblue"
+        range_values,
+        [record["min"] for record in records],
+        [record["max"] for record in records],
+        color="lightskyblue",
     )
     plt.xlabel(xlabel)
     plt.ylabel("Duration (s)")
     plt.show()
 
 
-# Measure execution time based on the number of vertices
-range_nb_vertices = np.arange(10, 100, 10)
-nb_iter = 15
-
-times_vertices = measure_execution_time(
-    range_nb_vertices,
-    nb_iter,
-    lambda x: graph.generate_graph_G(x, 3000),
-    lambda V, E, num_vertices: pathfinding.type_4(V, E, "s0", f"s{num_vertices-1}")
-)
-plot_results(range_nb_vertices, times_vertices, "Number of vertices")
-
-# Measure execution time based on the number of edges
-range_nb_edges = np.arange(1001, 1500, 100)
-times_edges = measure_execution_time(
-    range_nb_edges,
-    nb_iter,
-    lambda x: graph.generate_graph_G(100, x),
-    lambda V, E, _: pathfinding.type_4(V, E, "s0", "s98")
-)
-plot_results(range_nb_edges, times_edges, "Number of edges")
\ No newline at end of file
+def parse_args(argv):
+    """
+    Parses the command line of the benchmark suite.
+
+    Args:
+        argv (list): The command line arguments.
+
+    Returns:
+        argparse.Namespace: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description="Benchmarks the graph construction and the path algorithms."
+    )
+    parser.add_argument(
+        "--vertices",
+        type=int,
+        nargs="+",
+        default=[100],
+        help="numbers of vertices to sweep",
+    )
+    parser.add_argument(
+        "--edges",
+        type=int,
+        nargs="+",
+        default=[1000, 3000, 10000],
+        help="numbers of edges to sweep",
+    )
+    parser.add_argument(
+        "--benchmarks",
+        nargs="+",
+        choices=list(BENCHMARKS),
+        help="benchmarks to run, all by default",
+    )
+    parser.add_argument(
+        "--queries",
+        type=int,
+        default=20,
+        help="number of queries per query benchmark",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="number of timed runs",
+    )
+    parser.add_argument(
+        "--warmup",
+        type=int,
+        default=1,
+        help="number of untimed runs before the timed ones",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="seed of the generated graphs and queries",
+    )
+    parser.add_argument(
+        "--topology",
+        choices=graph.TOPOLOGIES,
+        help="topology of the generated graphs, the legacy generator by default",
+    )
+    parser.add_argument(
+        "--horizon",
+        type=int,
+        help="horizon of the generated graphs, 8760 for a year of hours, "
+        "graph.generate_network's by default",
+    )
+    parser.add_argument(
+        "--durations",
+        type=int,
+        nargs=2,
+        metavar=("MIN", "MAX"),
+        help="smallest and largest flight durations of the generated graphs, "
+        "graph.generate_network's by default",
+    )
+    parser.add_argument(
+        "--json",
+        help="file to write the results to in JSON",
+    )
+    parser.add_argument(
+        "--csv",
+        help="file to write the results to in CSV",
+    )
+    parser.add_argument(
+        "--baseline",
+        help="JSON results of a previous run to compare with",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="tolerated slowdown or memory growth against the baseline",
+    )
+    parser.add_argument(
+        "--plot",
+        help="benchmark to plot against the number of edges",
+    )
+
+    args = parser.parse_args(argv)
+
+    if args.topology is None and (args.horizon is not None or args.durations is not None):
+        parser.error("--horizon and --durations need a --topology")
+
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    available = available_benchmarks()
+    names = [name for name in args.benchmarks or available if name in available]
+
+    if not names:
+        sys.exit("No benchmark to run")
+    sizes = [
+        (nb_vertices, nb_edges) for nb_vertices in args.vertices for nb_edges in args.edges
+    ]
+    records = run_suite(
+        sizes,
+        names,
+        args.queries,
+        args.repeat,
+        args.warmup,
+        args.seed,
+        args.topology,
+        args.horizon,
+        args.durations,
+    )
+
+    if args.json:
+        write_json(records, args.json)
+
+    if args.csv:
+        write_csv(records, args.csv)
+
+    if args.plot:
+        plot_results(records, args.plot)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_to_baseline(records, json.load(f), args.threshold)
+
+        for name, nb_vertices, nb_edges, metric, before, after in regressions:
+            change = (
+                f"{before * 1000:.2f} ms -> {after * 1000:.2f} ms"
+                if metric == "median"
+                else f"{before} bytes -> {after} bytes"
+            )
+            print(f"Regression: {name}, {nb_vertices} vertices, {nb_edges} edges: {change}")
+
+        sys.exit(1 if regressions else 0)
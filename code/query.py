@@ -0,0 +1,283 @@
+import collections
+
+import graph
+import pathfinding
+
+
+CacheInfo = collections.namedtuple(
+    "CacheInfo", ["hits", "misses", "evictions", "size", "max_size"]
+)
+
+
+class QuerySession:
+    """
+    Answers many path queries against one time-expanded graph.
+
+    The graph and the indexes the algorithms rely on (flights sorted by
+    departure and by arrival time, adjacency lists) are built once when the
+    session is created, then shared by every query.
+
+    Attributes:
+        graph (TimeExpandedGraph): The time-expanded graph.
+    """
+
+    TYPES = {
+        1: pathfinding.type_1,
+        2: pathfinding.type_2,
+        3: pathfinding.type_3,
+        4: pathfinding.type_4,
+    }
+
+    def __init__(self, G):
+        """
+        Initializes the session and precomputes the indexes of the graph.
+
+        Args:
+            G (TimeExpandedGraph): The time-expanded graph.
+        """
+        self.graph = G
+        G.connections("departure")
+        G.connections("arrival")
+        G.adjacency()
+
+    @classmethod
+    def from_flights(cls, P):
+        """
+        Creates a session on the time-expanded graph of a list of flights.
+
+        Args:
+            P: A list of flights, where each flight is a tuple (u, v, t, l).
+
+        Returns:
+            QuerySession: The session.
+        """
+        return cls(graph.build_time_expanded_graph(P))
+
+    def query(self, start, end, kind):
+        """
+        Answers a single path query.
+
+        Args:
+            start: The starting vertex.
+            end: The target vertex.
+            kind (int): The type of path, from 1 to 4.
+
+        Returns:
+            The result of the pathfinding.type_<kind> function.
+
+        Raises:
+            ValueError: If kind is not a type of path.
+        """
+        if kind not in self.TYPES:
+            raise ValueError(f"Unknown path type: {kind}")
+
+        return self.TYPES[kind](self.graph, None, start, end)
+
+    def batch(self, queries):
+        """
+        Answers a batch of path queries.
+
+        Args:
+            queries (Iterable): The (start, end, kind) queries.
+
+        Returns:
+            list: The result of each query, in input order.
+        """
+        return [self.query(start, end, kind) for start, end, kind in queries]
+
+    def one_to_all(self, start, kind):
+        """
+        Answers the queries from an airport to every airport.
+
+        Types 1 and 4 are answered with a single search from the start, types 2
+        and 3 with one scan per destination.
+
+        Args:
+            start: The starting vertex.
+            kind (int): The type of path, from 1 to 4.
+
+        Returns:
+            dict: For each end vertex, the result of the query.
+        """
+        if kind == 1:
+            return pathfinding.earliest_arrival_all(self.graph, None, start)
+
+        if kind == 4:
+            return pathfinding.type_4_all(self.graph, None, start)
+
+        return {end: self.query(start, end, kind) for end in self.graph.airports}
+
+    def all_pairs_distances(self):
+        """
+        Computes the type IV distances between every pair of airports.
+
+        Returns:
+            np.ndarray: The matrix of distances, rows and columns follow
+                self.graph.airports, inf where there is no path.
+        """
+        return pathfinding.type_4_matrix(self.graph, None)
+
+
+class CachedQuerySession(QuerySession):
+    """
+    Query session that memoizes the results of the queries.
+
+    Results are kept in a least recently used cache keyed on the version of the
+    graph and the query, and the cache is emptied as soon as the version of the
+    graph changes. A one-to-all result is cached as a whole and answers the
+    later queries sharing its start and type. The cached results are shared
+    between the callers and must not be modified.
+
+    Attributes:
+        max_size (int): The maximum number of cached results, a one-to-all
+            result counting for one per destination.
+        hits (int): The number of queries answered from the cache.
+        misses (int): The number of queries computed.
+        evictions (int): The number of results evicted to make room.
+    """
+
+    def __init__(self, G, max_size=4096):
+        """
+        Initializes the session and its empty cache.
+
+        Args:
+            G (TimeExpandedGraph): The time-expanded graph.
+            max_size (int): The maximum number of cached results.
+        """
+        super().__init__(G)
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._results = collections.OrderedDict()
+        self._sizes = {}
+        self._size = 0
+        self._version = G.version
+
+    def query(self, start, end, kind):
+        """
+        Answers a single path query, from the cache when possible.
+
+        Args:
+            start: The starting vertex.
+            end: The target vertex.
+            kind (int): The type of path, from 1 to 4.
+
+        Returns:
+            The result of the pathfinding.type_<kind> function.
+
+        Raises:
+            ValueError: If kind is not a type of path.
+        """
+        key = self._key(start, end, kind)
+        tree_key = self._key(start, None, kind)
+
+        if key in self._results:
+            self.hits += 1
+            self._results.move_to_end(key)
+
+            return self._results[key]
+
+        if tree_key in self._results and end in self._results[tree_key]:
+            self.hits += 1
+            self._results.move_to_end(tree_key)
+
+            return self._results[tree_key][end]
+
+        self.misses += 1
+        result = super().query(start, end, kind)
+        self._store(key, result, 1)
+
+        return result
+
+    def one_to_all(self, start, kind):
+        """
+        Answers the queries from an airport to every airport, from the cache
+        when possible.
+
+        Args:
+            start: The starting vertex.
+            kind (int): The type of path, from 1 to 4.
+
+        Returns:
+            dict: For each end vertex, the result of the query.
+        """
+        key = self._key(start, None, kind)
+
+        if key in self._results:
+            self.hits += 1
+            self._results.move_to_end(key)
+
+            return self._results[key]
+
+        self.misses += 1
+
+        if kind in (1, 4):
+            results = super().one_to_all(start, kind)
+        else:
+            # the single results are not cached on top of the whole
+            results = {
+                end: QuerySession.query(self, start, end, kind)
+                for end in self.graph.airports
+            }
+
+        self._store(key, results, len(results))
+
+        return results
+
+    def cache_info(self):
+        """
+        Returns the statistics of the cache.
+
+        Returns:
+            CacheInfo: The hits, misses, evictions, current size and maximum size.
+        """
+        return CacheInfo(self.hits, self.misses, self.evictions, self._size, self.max_size)
+
+    def cache_clear(self):
+        """Empties the cache and resets its statistics."""
+        self._results.clear()
+        self._sizes.clear()
+        self._size = 0
+        self.hits = self.misses = self.evictions = 0
+
+    def _key(self, start, end, kind):
+        """
+        Returns the cache key of a query, emptying the cache if the graph changed.
+
+        Args:
+            start: The starting vertex.
+            end: The target vertex, None for a one-to-all query.
+            kind (int): The type of path, from 1 to 4.
+
+        Returns:
+            tuple: The key.
+        """
+        if self.graph.version != self._version:
+            self._results.clear()
+            self._sizes.clear()
+            self._size = 0
+            self._version = self.graph.version
+
+        return self._version, start, end, kind
+
+    def _store(self, key, result, size):
+        """
+        Caches a result, evicting the least recently used ones to make room.
+
+        Args:
+            key (tuple): The cache key.
+            result: The result of the query.
+            size (int): The size of the result.
+        """
+        if size > self.max_size:
+            return
+
+        while self._size + size > self.max_size:
+            evicted, _ = self._results.popitem(last=False)
+            self._size -= self._sizes.pop(evicted)
+            self.evictions += 1
+
+        self._results[key] = result
+        self._sizes[key] = size
+        self._size += size
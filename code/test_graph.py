@@ -0,0 +1,244 @@
+import os
+import random
+import shutil
+
+import numpy as np
+import pytest
+
+import graph
+import pathfinding
+import utils
+
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data.txt")
+SEEDS = range(30)
+
+
+def objective(kind, result):
+    """Returns the value a path of the given type optimizes."""
+    if kind == 4:
+        return result[1]
+
+    if result is None:
+        return None
+
+    if kind == 1:
+        return result[-1][2] + result[-1][3]
+
+    if kind == 2:
+        return result[0][2]
+
+    return result[-1][2] + result[-1][3] - result[0][2]
+
+
+def random_updates(G, P, rng, nb_updates):
+    """Applies random additions, cancellations and delays to G and to the list P."""
+    for _ in range(nb_updates):
+        action = rng.random()
+
+        if action < 0.3:
+            u, v = f"s{rng.randrange(7)}", f"s{rng.randrange(7)}"
+            flight = (u, v, rng.randint(0, 6), rng.randint(u == v, 2))
+            G.add_flight(*flight)
+            P.append(flight)
+            continue
+
+        flight = P.pop(rng.randrange(len(P)))
+
+        if action < 0.6:
+            G.remove_flight(*flight)
+        else:
+            delay = rng.randint(-2, 2)
+            G.delay_flight(*flight, delay)
+            P.append((flight[0], flight[1], flight[2] + delay, flight[3]))
+
+
+def network(seed):
+    P = graph.generate_network(
+        5, 20, topology="uniform", horizon=6, durations=(0, 2), seed=seed, as_tuples=True
+    )
+
+    # zero duration self-loops are not flights of the graph
+    return [flight for flight in P if flight[0] != flight[1] or flight[3] != 0]
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_updates_match_rebuild(seed):
+    rng = random.Random(seed)
+    P = network(seed)
+    G = graph.build_time_expanded_graph(P)
+
+    for _ in range(3):
+        random_updates(G, P, rng, 4)
+        H = graph.build_time_expanded_graph(P)
+
+        for start in H.airports:
+            for end in H.airports:
+                if start == end:
+                    continue
+
+                for kind in (1, 2, 3, 4):
+                    query = getattr(pathfinding, f"type_{kind}")
+                    assert objective(kind, query(G, None, start, end)) == objective(
+                        kind, query(H, None, start, end)
+                    )
+
+                assert objective(1, pathfinding.type_1(G, None, start, end, (2, 5))) == objective(
+                    1, pathfinding.type_1(H, None, start, end, (2, 5))
+                )
+
+    # the queries above answered from the flight indexes, without a rebuild
+    assert G.pending_updates > 0 or G.version == 0
+
+    assert sorted(G.vertices) == sorted(H.vertices)
+    assert G.pending_updates == 0
+    assert sorted((edge.u, edge.v, edge.weight) for edge in G.edges) == sorted(
+        (edge.u, edge.v, edge.weight) for edge in H.edges
+    )
+
+
+def test_remove_unknown_flight():
+    G = graph.build_time_expanded_graph([("a", "b", 1, 1)])
+
+    with pytest.raises(ValueError):
+        G.remove_flight("a", "b", 2, 1)
+
+    G.remove_flight("a", "b", 1, 1)
+
+    with pytest.raises(ValueError):
+        G.remove_flight("a", "b", 1, 1)
+
+
+def assert_same_graph(G, H):
+    assert G.airports == H.airports
+
+    for name in graph.GRAPH_ARRAYS:
+        assert np.array_equal(getattr(G, name), getattr(H, name)), name
+        assert getattr(G, name).dtype == getattr(H, name).dtype, name
+
+    for start in G.airports:
+        for end in G.airports:
+            for kind in (1, 2, 3, 4):
+                query = getattr(pathfinding, f"type_{kind}")
+                assert query(G, None, start, end) == query(H, None, start, end)
+
+
+@pytest.mark.parametrize("mmap", [True, False], ids=["mmap", "read"])
+def test_save_load(tmp_path, mmap):
+    G = graph.build_time_expanded_graph(network(0))
+    G.landmarks = pathfinding.build_landmarks(G, None, 2)
+    graph.save_graph(G, tmp_path / "graph.teg", "hash")
+    H = graph.load_graph(tmp_path / "graph.teg", mmap)
+
+    assert_same_graph(G, H)
+    assert graph.read_graph_header(tmp_path / "graph.teg")["source_hash"] == "hash"
+    assert np.array_equal(H.landmarks.to_landmark, G.landmarks.to_landmark)
+    assert np.array_equal(H.landmarks.from_landmark, G.landmarks.from_landmark)
+
+
+def test_cached_graph_rebuilds_on_change(tmp_path):
+    timetable = tmp_path / "data.txt"
+    shutil.copy(DATA, timetable)
+    (tmp_path / "data.txt.extra.0123456789abcdef.teg").write_bytes(b"other timetable")
+
+    G = graph.cached_graph(str(timetable))
+    assert_same_graph(G, graph.build_time_expanded_graph(utils.readFile(DATA)))
+
+    first = [entry for entry in os.listdir(tmp_path) if entry.startswith("data.txt.")]
+    assert len(first) == 2
+    assert_same_graph(graph.cached_graph(str(timetable)), G)
+
+    timetable.write_text(timetable.read_text().replace("c,g,7,1", "c,g,8,1"))
+    H = graph.cached_graph(str(timetable))
+
+    assert pathfinding.type_1(H, None, "a", "g")[-1][2] == 8
+    assert sorted(entry for entry in os.listdir(tmp_path) if entry.endswith(".teg")) == sorted(
+        ["data.txt.extra.0123456789abcdef.teg", f"data.txt.{graph.file_hash(timetable)[:16]}.teg"]
+    )
+
+
+@pytest.mark.parametrize(
+    "corrupt, message",
+    [
+        (lambda data: b"NOTAGRAPH" + data[9:], "not a time-expanded graph file"),
+        (
+            lambda data: data.replace(b'"version": 1', b'"version": 9', 1),
+            "unsupported format version 9",
+        ),
+        (lambda data: data[:16] + b"\xff" * 8 + data[24:], "corrupt header"),
+        (lambda data: data[: len(data) // 2], "truncated"),
+    ],
+    ids=["magic", "version", "header", "truncated"],
+)
+@pytest.mark.parametrize("mmap", [True, False], ids=["mmap", "read"])
+def test_load_corrupt_graph(tmp_path, corrupt, message, mmap):
+    path = tmp_path / "graph.teg"
+    graph.save_graph(graph.build_time_expanded_graph(network(0)), path)
+    path.write_bytes(corrupt(path.read_bytes()))
+
+    with pytest.raises(ValueError, match=message):
+        graph.load_graph(path, mmap)
+
+
+def write_timetable(path, airports, lines, nb_flights=None):
+    nb_flights = len([line for line in lines if line.strip()]) if nb_flights is None else nb_flights
+    path.write_text("\n".join([str(len(airports)), str(nb_flights), *airports, *lines]) + "\n")
+
+    return str(path)
+
+
+def flights_of(airports, flights):
+    return [(airports[u], airports[v], int(t), int(l)) for u, v, t, l in flights.tolist()]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 1000])
+def test_load_flights_matches_read_file(tmp_path, chunk_size):
+    lines = ["a,b,1,1", "", "b, c,2,1", "c,a,3,0", "a,c,3,2", "", "b,a,5,1"]
+    name = write_timetable(tmp_path / "timetable.txt", ["a", "b", "c"], lines)
+
+    assert flights_of(*utils.load_flights(name, chunk_size)) == utils.readFile(name)
+    assert utils.readFile(name) == [
+        ("a", "b", 1, 1),
+        ("b", "c", 2, 1),
+        ("c", "a", 3, 0),
+        ("a", "c", 3, 2),
+        ("b", "a", 5, 1),
+    ]
+    assert flights_of(*utils.load_flights(DATA)) == utils.readFile(DATA)
+
+
+@pytest.mark.parametrize(
+    "lines, nb_flights, lineno, line",
+    [
+        (["a,b,1,1", "a,b,2"], None, 7, "a,b,2"),
+        (["a,b,1,1", "", "a,x,2,1"], None, 8, "a,x,2,1"),
+        (["a,b,1,1", "a,b,two,1"], None, 7, "a,b,two,1"),
+        (["a,b,1,1", "", "a,c,2,1", "b,c,3,1"], 2, 9, "b,c,3,1"),
+    ],
+    ids=["fields", "airport", "time", "count"],
+)
+@pytest.mark.parametrize(
+    "read",
+    [
+        utils.readFile,
+        lambda name: utils.load_flights(name, 1),
+        lambda name: utils.load_flights(name),
+    ],
+    ids=["readFile", "load_flights-1", "load_flights"],
+)
+def test_timetable_format_error(tmp_path, lines, nb_flights, lineno, line, read):
+    name = write_timetable(tmp_path / "timetable.txt", ["a", "b", "c"], lines, nb_flights)
+
+    with pytest.raises(utils.TimetableFormatError) as error:
+        read(name)
+
+    assert (error.value.name, error.value.lineno, error.value.line) == (name, lineno, line)
+    assert f"line {lineno}" in str(error.value)
+
+
+def test_timetable_header_error(tmp_path):
+    path = tmp_path / "timetable.txt"
+    path.write_text("3\nmany\na\nb\nc\n")
+
+    with pytest.raises(utils.TimetableFormatError, match="line 2: expected an integer"):
+        utils.load_flights(str(path))
@@ -0,0 +1,50 @@
+import instrumentation
+
+
+@instrumentation.instrumented
+def inner(n):
+    instrumentation.count("inner", n)
+
+    return n
+
+
+@instrumentation.instrumented
+def outer(n):
+    with instrumentation.phase("search"):
+        for i in range(n):
+            instrumentation.count("steps")
+            inner(i)
+
+    with instrumentation.phase("path"):
+        instrumentation.count("steps", 10)
+
+    return n
+
+
+def test_disabled():
+    assert instrumentation.active() is None
+    assert outer(3) == 3
+    assert instrumentation.phase("search") is instrumentation.phase("path")
+
+
+def test_events():
+    calls = []
+    profiles = instrumentation.ProfileSink()
+
+    with instrumentation.enabled(calls.append), instrumentation.enabled(profiles):
+        assert outer(4) == 4
+
+    # the nested calls of inner are counted as part of outer
+    assert len(calls) == 1
+    stats = calls[0]
+    assert (stats.name, stats.args) == ("outer", (4,))
+    assert stats.counters == {"steps": 14, "inner": 6}
+    assert set(stats.timings) == {"search", "path"}
+    assert stats.duration >= stats.timings["search"] + stats.timings["path"]
+
+    assert stats.profile is not None
+    profiled = {function for _, _, function in profiles.stats.stats}
+    assert {"outer", "inner"} <= profiled
+
+    outer(1)
+    assert len(calls) == 1
@@ -0,0 +1,33 @@
+import os
+
+import pytest
+
+import graph
+import parallel
+import utils
+from query import QuerySession
+
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data.txt")
+
+
+@pytest.mark.parametrize("source", ["graph", "file"])
+def test_query_pool_matches_serial(tmp_path, source):
+    G = graph.build_time_expanded_graph(utils.readFile(DATA))
+    queries = [
+        (start, end, kind)
+        for start in G.airports
+        for end in G.airports
+        for kind in (1, 2, 3, 4)
+        if start != end
+    ]
+    expected = QuerySession(G).batch(queries)
+
+    if source == "file":
+        graph.save_graph(G, tmp_path / "data.teg")
+        G = str(tmp_path / "data.teg")
+
+    with parallel.QueryPool(G, workers=2, chunk_size=7) as pool:
+        results = pool.map(queries)
+
+    assert results == expected
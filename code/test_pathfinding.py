@@ -0,0 +1,348 @@
+import collections
+import os
+import random
+
+import numpy as np
+import pytest
+
+import graph
+import lp_backends
+import pathfinding
+import utils
+
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data.txt")
+SEEDS = range(50)
+
+
+def legacy_network(seed):
+    random.seed(seed)
+
+    return graph.generate_graph_G(6, 14)
+
+
+def zero_duration_network(seed):
+    return graph.generate_network(
+        5, 14, topology="uniform", horizon=4, durations=(0, 2), seed=seed, as_tuples=True
+    )
+
+
+NETWORKS = (
+    [pytest.param(utils.readFile(DATA), id="data.txt")]
+    + [pytest.param(legacy_network(seed), id=f"legacy-{seed}") for seed in SEEDS]
+    + [pytest.param(zero_duration_network(seed), id=f"zero-{seed}") for seed in SEEDS]
+    + [pytest.param([("b", "c", 1, 0), ("a", "b", 1, 0), ("a", "x", 0, 1)], id="chain")]
+)
+
+
+class Reference:
+    """
+    Answers the four types of path with Bellman-Ford on the copies of G tilde.
+    """
+
+    def __init__(self, P):
+        self.vertices, self.edges = graph.buildGraph(P)
+        self.copies = collections.defaultdict(list)
+
+        for vertex in self.vertices:
+            self.copies[vertex[0]].append(vertex)
+
+        for copies in self.copies.values():
+            copies.sort(key=lambda vertex: vertex[1])
+
+        self._distances = {}
+
+    def distance(self, source, destination):
+        if (source, destination) not in self._distances:
+            distance, _ = pathfinding.bellman_ford(self.vertices, self.edges, source, destination)
+            self._distances[source, destination] = distance
+
+        return self._distances[source, destination]
+
+    def reachable(self, source, destination):
+        return source == destination or self.distance(source, destination) != float("inf")
+
+    def earliest_arrival(self, start, end):
+        return min(
+            (t for _, t in self.copies[end] if self.reachable(self.copies[start][0], (end, t))),
+            default=None,
+        )
+
+    def latest_departure(self, start, end):
+        return max(
+            (t for _, t in self.copies[start] if self.reachable((start, t), self.copies[end][-1])),
+            default=None,
+        )
+
+    def fastest(self, start, end):
+        return min(
+            (
+                t2 - t1
+                for _, t1 in self.copies[start]
+                for _, t2 in self.copies[end]
+                if t1 <= t2 and self.reachable((start, t1), (end, t2))
+            ),
+            default=None,
+        )
+
+    def shortest(self, start, end):
+        return self.distance(self.copies[start][0], self.copies[end][-1])
+
+
+def check_path(P, path, start, end):
+    """Checks that a path takes flights of P, in order, from start to end."""
+    remaining = collections.Counter(P)
+
+    for flight in path:
+        assert remaining[flight] > 0, f"{flight} is not a flight"
+        remaining[flight] -= 1
+
+    for previous, following in zip(path, path[1:]):
+        assert previous[1] == following[0]
+        assert previous[2] + previous[3] <= following[2]
+
+    assert path[0][0] == start and path[-1][1] == end
+
+
+def pairs(P):
+    airports = list(dict.fromkeys(airport for u, v, _, _ in P for airport in (u, v)))
+
+    return [(start, end) for start in airports for end in airports if start != end]
+
+
+@pytest.mark.parametrize("P", NETWORKS)
+def test_type_1(P):
+    G, reference = graph.build_time_expanded_graph(P), Reference(P)
+
+    for start, end in pairs(P):
+        path = pathfinding.type_1(G, None, start, end)
+        expected = reference.earliest_arrival(start, end)
+
+        if expected is None:
+            assert path is None
+        else:
+            check_path(P, path, start, end)
+            assert path[-1][2] + path[-1][3] == expected
+
+
+@pytest.mark.parametrize("P", NETWORKS)
+def test_type_2(P):
+    G, reference = graph.build_time_expanded_graph(P), Reference(P)
+
+    for start, end in pairs(P):
+        path = pathfinding.type_2(G, None, start, end)
+        expected = reference.latest_departure(start, end)
+
+        if expected is None:
+            assert path is None
+        else:
+            check_path(P, path, start, end)
+            assert path[0][2] == expected
+
+
+@pytest.mark.parametrize("P", NETWORKS)
+def test_type_3(P):
+    G, reference = graph.build_time_expanded_graph(P), Reference(P)
+
+    for start, end in pairs(P):
+        path = pathfinding.type_3(G, None, start, end)
+        expected = reference.fastest(start, end)
+
+        if expected is None:
+            assert path is None
+        else:
+            check_path(P, path, start, end)
+            assert path[-1][2] + path[-1][3] - path[0][2] == expected
+
+
+@pytest.mark.parametrize("P", NETWORKS)
+def test_type_4(P):
+    G, reference = graph.build_time_expanded_graph(P), Reference(P)
+
+    for start, end in pairs(P):
+        path, distance = pathfinding.type_4(G, None, start, end)
+
+        assert distance == reference.shortest(start, end)
+
+        if distance != float("inf"):
+            check_path(P, path, start, end)
+            assert sum(flight[3] for flight in path) == distance
+
+
+@pytest.mark.parametrize("P", NETWORKS)
+def test_time_dependent(P):
+    H, reference = graph.build_time_dependent_graph(P), Reference(P)
+    objectives = {
+        pathfinding.type_1: (reference.earliest_arrival, lambda path: path[-1][2] + path[-1][3]),
+        pathfinding.type_2: (reference.latest_departure, lambda path: path[0][2]),
+        pathfinding.type_3: (
+            reference.fastest,
+            lambda path: path[-1][2] + path[-1][3] - path[0][2],
+        ),
+    }
+
+    for start, end in pairs(P):
+        for query, (expected, objective) in objectives.items():
+            path = query(H, None, start, end)
+
+            if expected(start, end) is None:
+                assert path is None
+            else:
+                check_path(P, path, start, end)
+                assert objective(path) == expected(start, end)
+
+        path, distance = pathfinding.type_4(H, None, start, end)
+
+        assert distance == reference.shortest(start, end)
+
+        if distance != float("inf"):
+            check_path(P, path, start, end)
+            assert sum(flight[3] for flight in path) == distance
+
+
+@pytest.mark.parametrize("P", NETWORKS)
+@pytest.mark.parametrize("with_landmarks", [False, True], ids=["static", "landmarks"])
+def test_type_4_astar(P, with_landmarks):
+    G, reference = graph.build_time_expanded_graph(P), Reference(P)
+    landmarks = pathfinding.build_landmarks(G, None, 3) if with_landmarks else None
+
+    for start, end in pairs(P):
+        path, distance = pathfinding.type_4_astar(G, None, start, end, landmarks)
+
+        assert distance == reference.shortest(start, end)
+
+        if distance != float("inf"):
+            check_path(P, path, start, end)
+            assert sum(flight[3] for flight in path) == distance
+
+
+# a solve costs a few milliseconds, so the LP backend is checked on a sample
+@pytest.mark.parametrize("P", NETWORKS[::10])
+def test_highs(P):
+    G, reference = graph.build_time_expanded_graph(P), Reference(P)
+    backend = lp_backends.get_backend("highs")
+
+    for start, end in pairs(P):
+        path, objective = backend.solve(G, None, start, end)
+
+        assert objective == reference.shortest(start, end)
+
+        if objective != float("inf"):
+            check_path(P, path, start, end)
+            assert sum(flight[3] for flight in path) == objective
+
+
+@pytest.mark.parametrize("P", NETWORKS[::10])
+def test_highs_session(P):
+    G = graph.build_time_expanded_graph(P)
+    backend = lp_backends.get_backend("highs")
+    session = backend.session(G)
+
+    for start, end in pairs(P):
+        assert session.solve(start, end)[1] == backend.solve(G, None, start, end)[1]
+
+
+def round_trip_network(seed):
+    P = graph.generate_network(
+        5, 20, topology="uniform", horizon=4, durations=(0, 2), seed=seed, as_tuples=True
+    )
+
+    # every flight has a zero duration return flight, so the flow may take cycles
+    return P + [(v, u, t + l, 0) for u, v, t, l in P if u != v]
+
+
+def test_path_from_flow_cuts_cycles():
+    P = [("a", "b", 1, 0), ("b", "d", 1, 0), ("d", "b", 1, 0), ("b", "c", 1, 0)]
+    G = graph.build_time_expanded_graph(P)
+    source, sink = lp_backends.flow_endpoints(G, "a", "c")
+    flow = np.ones(G.num_edges)
+
+    assert lp_backends.path_from_flow(G, flow, source, sink) == [
+        ("a", "b", 1, 0),
+        ("b", "c", 1, 0),
+    ]
+
+    flow[G.edge_v == sink] = 0
+
+    with pytest.raises(ValueError):
+        lp_backends.path_from_flow(G, flow, source, sink)
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_highs_round_trips(seed):
+    P = round_trip_network(seed)
+    G, reference = graph.build_time_expanded_graph(P), Reference(P)
+    backend = lp_backends.get_backend("highs")
+
+    for start, end in pairs(P):
+        path, objective = backend.solve(G, None, start, end)
+
+        assert objective == reference.shortest(start, end)
+
+        if objective != float("inf"):
+            check_path(P, path, start, end)
+
+
+@pytest.mark.parametrize("window", [None, (0, 10)], ids=["no-window", "window"])
+@pytest.mark.parametrize(
+    "P",
+    [
+        pytest.param([("a", "b", 1, 2), ("b", "c", 3, 1)], id="dag"),
+        pytest.param([("a", "b", 1, 0), ("b", "c", 3, 1)], id="zero-duration"),
+    ],
+)
+def test_dag_shortest_path_unknown_vertex(P, window):
+    G = graph.build_time_expanded_graph(P)
+
+    for start, end in [(("x", 1), ("c", 4)), (("a", 1), ("x", 4)), (("a", 2), ("c", 4))]:
+        assert pathfinding.dag_shortest_path(G, None, start, end, window) == (float("inf"), [])
+
+    assert pathfinding.dag_shortest_path(G, None, ("a", 1), ("c", 4), window)[0] == sum(
+        flight[3] for flight in P
+    )
+
+
+def test_bellman_ford_vectorized():
+    a, b, c, d, e = ("a", 1), ("b", 2), ("c", 3), ("d", 4), ("e", 5)
+    edges = [
+        graph.Edge(a, b, 4),
+        graph.Edge(a, c, 2),
+        graph.Edge(c, b, -1),
+        graph.Edge(b, d, 1),
+        graph.Edge(c, d, 5),
+        graph.Edge(e, a, 1),
+    ]
+    vertices = [a, b, c, d, e]
+
+    # a -> c -> b -> d beats both a -> b -> d and a -> c -> d
+    assert pathfinding.bellman_ford_vectorized(vertices, edges, a, d) == (2, [a, c, b, d])
+    assert pathfinding.bellman_ford_vectorized(vertices, edges, a, b) == (1, [a, c, b])
+    assert pathfinding.bellman_ford_vectorized(vertices, edges, a, e) == (float("inf"), [])
+    assert pathfinding.bellman_ford_vectorized(vertices, edges, ("x", 0), d) == (float("inf"), [])
+
+    G = graph.build_time_expanded_graph(utils.readFile(DATA))
+
+    # a,c,2,1 or a,c,4,1 then c,g,7,1, the waiting edges costing nothing
+    distance, path = pathfinding.bellman_ford_vectorized(G, None, ("a", 1), ("g", 8))
+
+    assert distance == 2
+    assert (path[0], path[-1]) == (("a", 1), ("g", 8))
+    assert pathfinding.bellman_ford_vectorized(G, None, ("b", 2), ("a", 1)) == (float("inf"), [])
+
+
+def test_type_4_astar_stale_landmarks():
+    G = graph.build_time_expanded_graph(utils.readFile(DATA))
+    landmarks = pathfinding.build_landmarks(G, None, 2)
+    G.landmarks = landmarks
+
+    # a direct flight makes the tables overestimate the duration from a to g
+    G.add_flight("a", "g", 1, 0)
+
+    with pytest.raises(ValueError, match="rebuild them"):
+        pathfinding.type_4_astar(G, None, "a", "g", landmarks)
+
+    # the stale G.landmarks are ignored rather than used
+    assert pathfinding.type_4_astar(G, None, "a", "g")[1] == 0
+    landmarks = pathfinding.build_landmarks(G, None, 2)
+
+    assert pathfinding.type_4_astar(G, None, "a", "g", landmarks)[1] == 0
@@ -0,0 +1,73 @@
+import os
+
+import pytest
+
+import graph
+import query
+import utils
+
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data.txt")
+
+
+@pytest.fixture
+def G():
+    return graph.build_time_expanded_graph(utils.readFile(DATA))
+
+
+def test_eviction_at_capacity(G):
+    session = query.CachedQuerySession(G, max_size=2)
+    session.query("a", "g", 4)
+    session.query("b", "g", 4)
+    session.query("a", "g", 4)
+    session.query("c", "g", 4)
+
+    # ("b", "g") was the least recently used result
+    assert session.cache_info() == query.CacheInfo(1, 3, 1, 2, 2)
+
+    session.query("a", "g", 4)
+    assert session.hits == 2
+
+    session.query("b", "g", 4)
+    assert session.misses == 4
+
+
+def test_one_to_all_larger_than_the_cache(G):
+    session = query.CachedQuerySession(G, max_size=2)
+    session.one_to_all("a", 4)
+    session.one_to_all("a", 4)
+
+    assert session.cache_info() == query.CacheInfo(0, 2, 0, 0, 2)
+
+
+@pytest.mark.parametrize(
+    "update",
+    [
+        lambda G: G.add_flight("a", "g", 1, 1),
+        lambda G: G.delay_flight("c", "g", 7, 1, 2),
+    ],
+    ids=["add_flight", "delay_flight"],
+)
+def test_invalidation_on_update(G, update):
+    session = query.CachedQuerySession(G)
+    before = session.query("a", "g", 1)
+    update(G)
+    after = session.query("a", "g", 1)
+
+    assert session.cache_info().misses == 2
+    assert after == query.QuerySession(G).query("a", "g", 1)
+    assert after != before
+
+
+@pytest.mark.parametrize("kind", [1, 2, 3, 4])
+def test_tree_key_reuse(G, kind):
+    session = query.CachedQuerySession(G)
+    uncached = query.QuerySession(G)
+    session.one_to_all("a", kind)
+
+    for end in G.airports:
+        if end != "a":
+            assert session.query("a", end, kind) == uncached.query("a", end, kind)
+
+    assert session.misses == 1
+    assert session.hits == len(G.airports) - 1
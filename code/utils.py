@@ -1,3 +1,37 @@
+import itertools
+
+import numpy as np
+
+
+FLIGHT_DTYPE = np.dtype([("u", np.int32), ("v", np.int32), ("t", np.int64), ("l", np.int64)])
+
+
+class TimetableFormatError(ValueError):
+    """
+    Raised when a line of a timetable file is malformed.
+
+    Attributes:
+        name (str): The name of the file.
+        lineno (int): The number of the malformed line, starting at 1.
+        line (str): The content of the line.
+    """
+
+    def __init__(self, name, lineno, line, reason):
+        """
+        Initializes the error.
+
+        Args:
+            name (str): The name of the file.
+            lineno (int): The number of the malformed line, starting at 1.
+            line (str): The content of the line.
+            reason (str): What is wrong with the line.
+        """
+        super().__init__(f"{name}, line {lineno}: {reason}: {line!r}")
+        self.name = name
+        self.lineno = lineno
+        self.line = line
+
+
 def readTerminal():
     """
     Reads input from the terminal and returns a list of edges to describe a graph.
@@ -25,6 +59,205 @@ def readTerminal():
     return P
 
 
+def _read_int(f, name, lineno):
+    """
+    Reads a header line holding an integer.
+
+    Args:
+        f: The open file.
+        name (str): The name of the file.
+        lineno (int): The number of the line.
+
+    Returns:
+        int: The integer.
+
+    Raises:
+        TimetableFormatError: If the line does not hold an integer.
+    """
+    line = f.readline().strip()
+
+    try:
+        return int(line)
+    except ValueError:
+        raise TimetableFormatError(name, lineno, line, "expected an integer") from None
+
+
+def _read_header(f, name):
+    """
+    Reads the header of a timetable file: the counts and the airport names.
+
+    Args:
+        f: The open file.
+        name (str): The name of the file.
+
+    Returns:
+        tuple: The list of airport names and the number of flights.
+    """
+    nb_s = _read_int(f, name, 1)
+    nb_a = _read_int(f, name, 2)
+    airports = [f.readline().strip() for _ in range(nb_s)]
+
+    return airports, nb_a
+
+
+def _parse_flight(line, airport_ids, name, lineno):
+    """
+    Parses a flight line "u,v,t,l".
+
+    Args:
+        line (str): The line.
+        airport_ids (dict): The id of each airport declared in the header.
+        name (str): The name of the file.
+        lineno (int): The number of the line.
+
+    Returns:
+        tuple: The flight (u, v, t, l).
+
+    Raises:
+        TimetableFormatError: If the line is malformed.
+    """
+    tmp = line.split(",")
+
+    if len(tmp) != 4:
+        raise TimetableFormatError(name, lineno, line, 'expected "u,v,t,l"')
+
+    u, v = tmp[0].strip(), tmp[1].strip()
+
+    for airport in (u, v):
+        if airport not in airport_ids:
+            raise TimetableFormatError(name, lineno, line, f"unknown airport {airport!r}")
+
+    try:
+        t, l = int(tmp[2]), int(tmp[3])
+    except ValueError:
+        raise TimetableFormatError(name, lineno, line, "expected integer times") from None
+
+    return u, v, t, l
+
+
+def iter_flights(name):
+    """
+    Reads a timetable file lazily, one flight at a time.
+
+    Args:
+        name (str): The name of the file to read.
+
+    Yields:
+        tuple: The flights (u, v, t, l), in file order.
+
+    Raises:
+        TimetableFormatError: If a line is malformed, or if the file holds more
+            flights than declared, as in load_flights.
+    """
+    with open(name, "r") as f:
+        airports, nb_a = _read_header(f, name)
+        airport_ids = {airport: i for i, airport in enumerate(airports)}
+        count = 0
+
+        for lineno, line in enumerate(f, start=len(airports) + 3):
+            if line.strip():
+                if count == nb_a:
+                    raise TimetableFormatError(
+                        name, lineno, line.strip(), f"more than {nb_a} flights"
+                    )
+
+                count += 1
+                yield _parse_flight(line.strip(), airport_ids, name, lineno)
+
+
+def _parse_chunk(rows, airport_ids):
+    """
+    Parses well-formed flight lines into columns without a Python loop per line.
+
+    Args:
+        rows (list): The flight lines "u,v,t,l".
+        airport_ids (dict): The id of each airport declared in the header.
+
+    Returns:
+        tuple: The arrays of u ids, v ids, t and l.
+
+    Raises:
+        ValueError: If a line does not have 4 fields or its times are not integers.
+        KeyError: If a line has an airport that is not declared.
+    """
+    if any(row.count(",") != 3 for row in rows):
+        raise ValueError("expected 4 fields per line")
+
+    fields = ",".join(rows).split(",")
+    nb_rows = len(rows)
+
+    return (
+        np.fromiter(map(airport_ids.__getitem__, fields[0::4]), np.int32, nb_rows),
+        np.fromiter(map(airport_ids.__getitem__, fields[1::4]), np.int32, nb_rows),
+        np.fromiter(map(int, fields[2::4]), np.int64, nb_rows),
+        np.fromiter(map(int, fields[3::4]), np.int64, nb_rows),
+    )
+
+
+def load_flights(name, chunk_size=1000000):
+    """
+    Reads a timetable file into a NumPy structured array, chunk by chunk.
+
+    Each chunk of lines is split into columns at once and copied into an
+    array of the size declared in the header, so memory stays bounded by the
+    result plus one chunk.
+
+    Args:
+        name (str): The name of the file to read.
+        chunk_size (int): The number of lines parsed at a time.
+
+    Returns:
+        tuple: The list of airport names and the array of flights, of dtype
+            FLIGHT_DTYPE, where u and v are indices in the list of airports.
+
+    Raises:
+        TimetableFormatError: If a line is malformed, or if the file holds more
+            flights than declared.
+    """
+    with open(name, "r") as f:
+        airports, nb_a = _read_header(f, name)
+        airport_ids = {airport: i for i, airport in enumerate(airports)}
+        flights = np.empty(nb_a, dtype=FLIGHT_DTYPE)
+        lineno = len(airports) + 3
+        count = 0
+
+        while True:
+            lines = list(itertools.islice(f, chunk_size))
+
+            if not lines:
+                break
+
+            offsets = [k for k, line in enumerate(lines) if line.strip()]
+
+            if count + len(offsets) > nb_a:
+                k = offsets[nb_a - count]
+                raise TimetableFormatError(
+                    name, lineno + k, lines[k].strip(), f"more than {nb_a} flights"
+                )
+
+            try:
+                columns = _parse_chunk([lines[k] for k in offsets], airport_ids)
+            except (ValueError, KeyError):
+                # parse the chunk line by line, to strip spaces or report the malformed line
+                parsed = [
+                    _parse_flight(lines[k].strip(), airport_ids, name, lineno + k)
+                    for k in offsets
+                ]
+                columns = (
+                    [airport_ids[u] for u, _, _, _ in parsed],
+                    [airport_ids[v] for _, v, _, _ in parsed],
+                    [t for _, _, t, _ in parsed],
+                    [l for _, _, _, l in parsed],
+                )
+
+            chunk = flights[count : count + len(offsets)]
+            chunk["u"], chunk["v"], chunk["t"], chunk["l"] = columns
+            count += len(offsets)
+            lineno += len(lines)
+
+    return airports, flights[:count]
+
+
 def readFile(name):
     """
     Reads a file and returns a list of edges.
@@ -36,22 +269,12 @@ def readFile(name):
         list: A list of edges, where each edge is represented as a tuple (u, v, t, l).
 
     Raises:
-        Exception: If the file is not found or cannot be read.
+        TimetableFormatError: If a line of the file is malformed, or if the
+            file holds more flights than declared.
     """
-    p = []
-
     try:
-        with open(name, "r") as f:
-            tmp = f.read()
-            line_list = tmp.splitlines()
-            nb_s = int(line_list[0])
-            nb_a = int(line_list[1])
-
-            for i in range(nb_s + 2, len(line_list)):
-                tmp = line_list[i].split(",")
-                u, v, t, l = tmp[0], tmp[1], int(tmp[2]), int(tmp[3])
-                p.append((u, v, t, l))
-    except Exception as e:
+        return list(iter_flights(name))
+    except OSError as e:
         print("File not found\n", e)
 
-    return p
+        return []